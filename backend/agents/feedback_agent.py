@@ -1,9 +1,101 @@
+import asyncio
+import json
 from typing import Any, Dict, List
 
 try:
 	from ..services.ml_client import chat_reasoning
+	from ..core.config import get_settings
 except ImportError:
 	from services.ml_client import chat_reasoning
+	from core.config import get_settings
+
+settings = get_settings()
+
+SYSTEM_PROMPT = "You are a helpful recommendation explainer. Be concise and specific."
+
+
+def _item_id(r: Dict[str, Any]) -> int:
+	return int(r.get("id", r.get("item", {}).get("id", 0)))
+
+
+def _clean(explanation: str) -> str:
+	return explanation.strip().strip('"').strip("'")
+
+
+def _fallback(r: Dict[str, Any], interests: List[str]) -> str:
+	title = str(r.get("title", ""))
+	description = str(r.get("description", ""))
+	category = str(r.get("category", ""))
+	if category and interests:
+		# Try to find matching interest
+		matching = [i for i in interests if i.lower() in description.lower() or i.lower() in title.lower()]
+		if matching:
+			return f"Aligns with your {matching[0]} interests"
+		return f"Strong match for {category} learners"
+	return "Highly relevant to your profile"
+
+
+async def _explain_one(r: Dict[str, Any], interests: List[str], interest_str: str) -> str:
+	title = str(r.get("title", ""))
+	category = str(r.get("category", ""))
+	
+	# Build a prompt for personalized explanation
+	prompt = (
+		f"Explain in ONE concise sentence (max 12 words) why '{title}' "
+		f"is recommended for someone interested in: {interest_str}. "
+		f"Focus on the connection between their interests and this {category} course."
+	)
+	
+	try:
+		explanation = _clean(await chat_reasoning(prompt, system_prompt=SYSTEM_PROMPT, max_tokens=50))
+		return explanation or f"Matches your interest in {interest_str}"
+	except Exception as e:
+		# Fallback to simple explanation
+		print(f"⚠️  Failed to generate explanation for {title}: {e}")
+		return _fallback(r, interests)
+
+
+async def _explain_batch(pending: Dict[int, Dict[str, Any]], interest_str: str) -> Dict[int, str]:
+	"""
+	Explanations for all pending items from one structured-JSON call. Only entries
+	for ids that were asked for and that carry a non-empty sentence are returned;
+	the caller explains whatever is missing one by one.
+	"""
+	item_list = "\n".join(
+		f"- id {item_id}: '{r.get('title', '')}' ({r.get('category', '')} course)"
+		for item_id, r in pending.items()
+	)
+	prompt = (
+		f"For each course below, explain in ONE concise sentence (max 12 words) why it "
+		f"is recommended for someone interested in: {interest_str}. "
+		f"Focus on the connection between their interests and the course.\n\n"
+		f"{item_list}\n\n"
+		'Return ONLY a JSON object mapping each id to its sentence. Example: {"12": "...", "7": "..."}'
+	)
+	
+	try:
+		response = await chat_reasoning(
+			prompt,
+			system_prompt=SYSTEM_PROMPT + " Output valid JSON only.",
+			max_tokens=40 * len(pending) + 50
+		)
+		cleaned = response.replace("```json", "").replace("```", "").strip()
+		data = json.loads(cleaned)
+		if not isinstance(data, dict):
+			raise ValueError("LLM did not return an object")
+	except Exception as e:
+		print(f"⚠️  Batched explanations failed, explaining items individually: {e}")
+		return {}
+	
+	explanations: Dict[int, str] = {}
+	for key, value in data.items():
+		try:
+			item_id = int(key)
+		except (TypeError, ValueError):
+			continue
+		if item_id in pending and isinstance(value, str) and _clean(value):
+			explanations[item_id] = _clean(value)
+	return explanations
 
 
 async def run(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -19,51 +111,28 @@ async def run(state: Dict[str, Any]) -> Dict[str, Any]:
 	interest_str = ", ".join(interests) if interests else "general learning"
 	
 	# Generate explanations for top 10 items (avoid too many API calls)
-	for idx, r in enumerate(recs[:10]):
-		item_id = int(r.get("id", r.get("item", {}).get("id", 0)))
+	pending: Dict[int, Dict[str, Any]] = {}
+	for r in recs[:10]:
+		item_id = _item_id(r)
 		# If reranker already provided a reason, keep it
 		if str(r.get("explanation", "")).strip():
 			explanations[item_id] = str(r.get("explanation")).strip()
-			continue
-		title = str(r.get("title", ""))
-		description = str(r.get("description", ""))
-		category = str(r.get("category", ""))
-		score = float(r.get("score", 0.0))
-		
-		# Build a prompt for personalized explanation
-		prompt = (
-			f"Explain in ONE concise sentence (max 12 words) why '{title}' "
-			f"is recommended for someone interested in: {interest_str}. "
-			f"Focus on the connection between their interests and this {category} course."
-		)
-		
-		try:
-			explanation = await chat_reasoning(
-				prompt,
-				system_prompt="You are a helpful recommendation explainer. Be concise and specific.",
-				max_tokens=50
-			)
-			# Clean up the explanation
-			explanation = explanation.strip().strip('"').strip("'")
-			if not explanation:
-				explanation = f"Matches your interest in {interest_str}"
-			explanations[item_id] = explanation
-		except Exception as e:
-			# Fallback to simple explanation
-			print(f"⚠️  Failed to generate explanation for {title}: {e}")
-			if category and interests:
-				# Try to find matching interest
-				matching = [i for i in interests if i.lower() in description.lower() or i.lower() in title.lower()]
-				if matching:
-					explanations[item_id] = f"Aligns with your {matching[0]} interests"
-				else:
-					explanations[item_id] = f"Strong match for {category} learners"
-			else:
-				explanations[item_id] = "Highly relevant to your profile"
+		else:
+			pending.setdefault(item_id, r)
+	
+	# One structured call for all of them; per-item calls only for what it missed
+	if pending and settings.explanation_batch.lower() == "on":
+		batched = await _explain_batch(pending, interest_str)
+		explanations.update(batched)
+		pending = {item_id: r for item_id, r in pending.items() if item_id not in batched}
+	
+	if pending:
+		results = await asyncio.gather(*(_explain_one(r, interests, interest_str) for r in pending.values()))
+		explanations.update(zip(pending.keys(), results))
 	
 	# For remaining items (11+), use simpler explanations to save API calls
 	for r in recs[10:]:
-		item_id = int(r.get("id", r.get("item", {}).get("id", 0)))
+		item_id = _item_id(r)
 		if item_id not in explanations:
 			category = str(r.get("category", ""))
 			explanations[item_id] = f"Recommended {category} course"
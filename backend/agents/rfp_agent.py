@@ -11,8 +11,9 @@ except ImportError:
 
 from models.rfp import Quotation
 from services.ml_client import chat_reasoning
-from services.embeddings import embed_text
-from services.vector_search import search_similar_products
+from services.embeddings import embed_texts
+from services.vector_search import search_products_with_specs
+from services.product_specs import requirement_constraints
 
 class RFPState(TypedDict):
     pdf_text: str
@@ -167,6 +168,8 @@ async def match_products_node(state: RFPState) -> RFPState:
     reqs = state.get("requirements", [])
     matches = []
     
+    # Build every search text first so all lines embed in one batch request
+    queries = []
     for req in reqs:
         # Build search text
         search_text = (
@@ -183,9 +186,15 @@ async def match_products_node(state: RFPState) -> RFPState:
              search_text = req.get('Description', '')
 
         if not search_text: continue
-            
-        embedding = await embed_text(search_text)
-        candidates = await search_similar_products(embedding, top_k=5)
+        queries.append((req, search_text))
+
+    embeddings = await embed_texts([text for _, text in queries], table="products")
+    # One round trip for every line's top-k, hard specs (IP, CCT, wattage) filtered in SQL
+    all_candidates = await search_products_with_specs(
+        embeddings, [requirement_constraints(req) for req, _ in queries], top_k=5
+    )
+
+    for (req, _), candidates in zip(queries, all_candidates):
         
         if candidates:
             best = candidates[0]
@@ -202,6 +211,7 @@ async def match_products_node(state: RFPState) -> RFPState:
                 "product_title": best.get("title"),
                 "product_description": best.get("description"),
                 "match_score": score,
+                "spec_match": best.get("spec_match", False),
                 "reasoning": f"Best Match: {best.get('title')} ({score:.2f}). Alts: {alt_text}",
                 "quantity": qty_val,
                 "unit_price": float(best.get("price", 100.0)),
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException
+
+from services import vector_indexes, vector_storage
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/vector-indexes")
+async def vector_index_health():
+    """
+    Per-table vector index health: rows, live index (method, lists, size, scans),
+    last managed build, the index the table size calls for, and the per-query search settings.
+    """
+    return await vector_indexes.health()
+
+
+@router.post("/vector-indexes/{table}/rebuild")
+async def rebuild_vector_index(table: str):
+    """
+    Build the index the table's size calls for now instead of waiting for the maintainer.
+    """
+    if table not in vector_storage.SEARCH_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown vector table: {table}")
+    plan = await vector_indexes.plan(table)
+    if plan["target"]["method"] is None:
+        return {"status": "skipped", "reason": plan["reason"]}
+    await vector_indexes.build(table, plan["target"]["method"], plan["target"]["lists"], plan["rows"])
+    return {"status": "rebuilt", "table": table, "index": plan["target"]}
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import uuid
@@ -9,13 +10,17 @@ from decimal import Decimal
 
 # Try importing the LLM service, fallback if missing
 try:
-    from services.ml_client import chat_reasoning
+    from services.ml_client import chat_reasoning, chat_reasoning_stream
 except ImportError:
     async def chat_reasoning(prompt, max_tokens=1000):
         return "Error: LLM service not available."
 
+    async def chat_reasoning_stream(prompt, max_tokens=1000):
+        yield "Error: LLM service not available."
+
 from services import db_tools
 from core.database import fetch, execute
+from core.utils import sse_event
 
 router = APIRouter(prefix="/db-chat", tags=["db-chat"])
 
@@ -89,43 +94,31 @@ async def get_history(session_id: str):
     except Exception:
         return []
 
-@router.post("/message")
-async def chat_db(payload: ChatRequest):
-    await ensure_chat_table()
-    session_id = payload.session_id or str(uuid.uuid4())
+async def schema_context() -> str:
+    tables = await db_tools.list_tables()
+    schema_info = []
     
-    try:
-        # 1. Store User Msg
-        await execute(
-            "INSERT INTO db_chat_history (session_id, role, content) VALUES ($1, 'user', $2)",
-            session_id, payload.query
-        )
-
-        # 2. Get Schema Context
-        tables = await db_tools.list_tables()
-        schema_info = []
-        
-        # Prioritize core business tables
-        # Note: 'items' often contains product info, 'quotations' or 'opportunities' contains value/sales info
-        core_tables = ["items", "users", "quotations", "opportunities", "products", "interactions", "journeys"]
-        
-        for t in tables:
-            if t in core_tables or len(tables) < 15:
-                cols = await db_tools.describe_table(t)
-                if cols:
-                    col_str = ", ".join([f"{c['column_name']}({c['data_type']})" for c in cols])
-                    schema_info.append(f"Table {t}: {col_str}")
-        
-        context_str = "\n".join(schema_info)
+    # Prioritize core business tables
+    # Note: 'items' often contains product info, 'quotations' or 'opportunities' contains value/sales info
+    core_tables = ["items", "users", "quotations", "opportunities", "products", "interactions", "journeys"]
+    
+    for t in tables:
+        if t in core_tables or len(tables) < 15:
+            cols = await db_tools.describe_table(t)
+            if cols:
+                col_str = ", ".join([f"{c['column_name']}({c['data_type']})" for c in cols])
+                schema_info.append(f"Table {t}: {col_str}")
+    
+    return "\n".join(schema_info)
 
-        # 3. LLM: Generate SQL
-        prompt = f"""
+def sql_prompt(context_str: str, query: str) -> str:
+    return f"""
         You are a Senior PostgreSQL Data Analyst. 
         
         Database Schema:
         {context_str}
         
-        User Question: {payload.query}
+        User Question: {query}
         
         Instructions:
         1. If the user asks for "sales" or "orders", check tables like 'quotations' or 'opportunities' which represent business value.
@@ -134,8 +127,53 @@ async def chat_db(payload: ChatRequest):
         4. Use ILIKE for text searches.
         5. Limit results to 20 rows.
         """
-        
-        llm_resp = await chat_reasoning(prompt, max_tokens=300)
+
+def extract_sql(llm_resp: str) -> Optional[str]:
+    # Extract SQL carefully
+    parts = llm_resp.split("```sql")
+    if len(parts) > 1:
+        return parts[1].split("```")[0].strip()
+    return None
+
+def summary_prompt(query: str, sql_query: str, results: List[Dict[str, Any]]) -> str:
+    # Serialize safely for the prompt
+    data_str = safe_json_dumps(results[:10])
+    
+    return f"""
+                    User Question: {query}
+                    SQL Query Executed: {sql_query}
+                    Data Results (First 10 rows): {data_str} 
+                    Total Rows: {len(results)}
+                    
+                    Provide a concise, professional answer based on these results.
+                    """
+
+async def store_message(session_id: str, role: str, content: str, sql_query: Optional[str] = None, data_snapshot=None):
+    # Safe serialization for the database
+    snapshot_json = safe_json_dumps(data_snapshot) if data_snapshot is not None else None
+    
+    await execute(
+        """
+        INSERT INTO db_chat_history (session_id, role, content, sql_query, data_snapshot) 
+        VALUES ($1, $2, $3, $4, $5)
+        """,
+        session_id, role, content, sql_query, snapshot_json
+    )
+
+@router.post("/message")
+async def chat_db(payload: ChatRequest):
+    await ensure_chat_table()
+    session_id = payload.session_id or str(uuid.uuid4())
+    
+    try:
+        # 1. Store User Msg
+        await store_message(session_id, "user", payload.query)
+
+        # 2. Get Schema Context
+        context_str = await schema_context()
+
+        # 3. LLM: Generate SQL
+        llm_resp = await chat_reasoning(sql_prompt(context_str, payload.query), max_tokens=300)
         
         if not llm_resp:
             llm_resp = "I'm sorry, I couldn't generate a response at this time."
@@ -147,11 +185,7 @@ async def chat_db(payload: ChatRequest):
         # 4. Extract and Run SQL
         if "```sql" in llm_resp:
             try:
-                # Extract SQL carefully
-                parts = llm_resp.split("```sql")
-                if len(parts) > 1:
-                    sql_content = parts[1].split("```")[0].strip()
-                    sql_query = sql_content
+                sql_query = extract_sql(llm_resp)
                 
                 if sql_query:
                     # Execute
@@ -159,18 +193,7 @@ async def chat_db(payload: ChatRequest):
                     data_snapshot = results
                     
                     # 5. Summarize Results
-                    # Serialize safely for the prompt
-                    data_str = safe_json_dumps(results[:10])
-                    
-                    summary_prompt = f"""
-                    User Question: {payload.query}
-                    SQL Query Executed: {sql_query}
-                    Data Results (First 10 rows): {data_str} 
-                    Total Rows: {len(results)}
-                    
-                    Provide a concise, professional answer based on these results.
-                    """
-                    summary_resp = await chat_reasoning(summary_prompt)
+                    summary_resp = await chat_reasoning(summary_prompt(payload.query, sql_query, results))
                     if summary_resp:
                         final_response = summary_resp
                     
@@ -180,16 +203,7 @@ async def chat_db(payload: ChatRequest):
                 final_response += f"\n\n(Note: I attempted to run a query but it encountered an error: {str(e)})"
 
         # 6. Store Bot Response
-        # Safe serialization for the database
-        snapshot_json = safe_json_dumps(data_snapshot) if data_snapshot is not None else None
-        
-        await execute(
-            """
-            INSERT INTO db_chat_history (session_id, role, content, sql_query, data_snapshot) 
-            VALUES ($1, 'bot', $2, $3, $4)
-            """,
-            session_id, final_response, sql_query, snapshot_json
-        )
+        await store_message(session_id, "bot", final_response, sql_query, data_snapshot)
 
         return {
             "session_id": session_id,
@@ -200,4 +214,70 @@ async def chat_db(payload: ChatRequest):
 
     except Exception as e:
         print(f"Chat DB Critical Error: {traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/message/stream")
+async def chat_db_stream(payload: ChatRequest):
+    """
+    Server-Sent Events version of /message. The SQL is generated in one call (it has
+    to be complete before it can run); once it has run, an `sql` event carries the
+    query and rows and the summary streams as `token` events, ending with `done`.
+    The bot message is stored when the stream completes.
+    """
+    await ensure_chat_table()
+    session_id = payload.session_id or str(uuid.uuid4())
+    await store_message(session_id, "user", payload.query)
+
+    async def events():
+        yield sse_event("meta", json.dumps({"session_id": session_id}))
+        try:
+            context_str = await schema_context()
+            llm_resp = await chat_reasoning(sql_prompt(context_str, payload.query), max_tokens=300)
+            if not llm_resp:
+                llm_resp = "I'm sorry, I couldn't generate a response at this time."
+
+            sql_query = None
+            data_snapshot = None
+            parts: List[str] = []
+
+            if "```sql" in llm_resp:
+                try:
+                    sql_query = extract_sql(llm_resp)
+                    if sql_query:
+                        results = await db_tools.run_custom_sql(sql_query)
+                        data_snapshot = results
+                        yield sse_event("sql", safe_json_dumps({"sql": sql_query, "data": results}))
+                        async for text in chat_reasoning_stream(summary_prompt(payload.query, sql_query, results)):
+                            parts.append(text)
+                            yield sse_event("token", json.dumps({"text": text}))
+                except Exception as e:
+                    print(f"SQL Execution/Processing Error: {e}")
+                    note = f"\n\n(Note: I attempted to run a query but it encountered an error: {str(e)})"
+                    if not parts:
+                        parts.append(llm_resp)
+                        yield sse_event("token", json.dumps({"text": llm_resp}))
+                    parts.append(note)
+                    yield sse_event("token", json.dumps({"text": note}))
+
+            if not parts:
+                parts.append(llm_resp)
+                yield sse_event("token", json.dumps({"text": llm_resp}))
+
+            final_response = "".join(parts)
+            await store_message(session_id, "bot", final_response, sql_query, data_snapshot)
+            yield sse_event("done", safe_json_dumps({
+                "session_id": session_id,
+                "response": final_response,
+                "sql": sql_query,
+                "data": data_snapshot
+            }))
+
+        except Exception as e:
+            print(f"Chat DB Stream Error: {traceback.format_exc()}")
+            yield sse_event("error", json.dumps({"detail": str(e)}))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
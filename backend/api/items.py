@@ -6,7 +6,8 @@ import os
 import uuid
 
 from core.database import fetch, execute, fetchval
-from services.embeddings import embed_and_store_product, embed_all_products_missing
+from core.utils import jsonable_row
+from services import embedding_jobs, neighbors, product_index, search_cache
 from services.vector_search import search_similar_products
 
 router = APIRouter(prefix="/items", tags=["items"])
@@ -62,12 +63,12 @@ async def get_products():
     Fetch all products from the 'products' table.
     """
     rows = await fetch("SELECT * FROM products ORDER BY id DESC LIMIT 100")
-    return [dict(row) for row in rows]
+    return [jsonable_row(row) for row in rows]
 
 @router.post("/add")
 async def add_product(payload: ProductCreate):
     """
-    Add a new product and generate its embedding.
+    Add a new product and queue its embedding.
     """
     main_image = payload.images[0] if payload.images else None
     
@@ -93,9 +94,9 @@ async def add_product(payload: ProductCreate):
             main_image
         )
         
-        # Generate embedding immediately
-        search_text = f"{payload.fixture_type} {payload.title} {payload.description} {payload.wattage} {payload.cct} {payload.ip_rating}"
-        await embed_and_store_product(product_id, search_text)
+        # Embedding is generated by the background worker
+        await embedding_jobs.enqueue("products", [product_id])
+        await search_cache.bump("products")
         
         return {"status": "success", "id": product_id}
     except Exception as e:
@@ -105,7 +106,7 @@ async def add_product(payload: ProductCreate):
 @router.put("/{product_id}")
 async def update_product(product_id: int, payload: ProductUpdate):
     """
-    Update a product and REGENERATE its embedding.
+    Update a product and queue a REGENERATION of its embedding.
     """
     fields = []
     values = []
@@ -161,21 +162,15 @@ async def update_product(product_id: int, payload: ProductUpdate):
 
         await execute(query, *values)
         
-        # Fetch updated record to get generated fields for embedding
-        rows = await fetch("SELECT title, description, fixture_type, wattage, cct, ip_rating FROM products WHERE id = $1", product_id)
-        
-        if rows:
-            p = dict(rows[0])
-            search_text = (
-                f"{p.get('fixture_type', '')} "
-                f"{p.get('title', '')} "
-                f"{p.get('description', '')} "
-                f"{p.get('wattage', '')} "
-                f"{p.get('cct', '')} "
-                f"{p.get('ip_rating', '')}"
-            ).strip()
-            
-            await embed_and_store_product(product_id, search_text)
+        # Price/image-only edits leave the search text untouched, so skip the re-embed
+        text_changed = any(
+            v is not None for v in (payload.description, payload.fixture_type, payload.wattage, payload.cct, payload.ip_rating)
+        )
+        if text_changed:
+            await embedding_jobs.enqueue("products", [product_id])
+        # Price/spec fields served from the in-process index; the vector follows from the worker
+        await product_index.refresh([product_id])
+        await search_cache.bump("products")
             
         return {"status": "success", "message": "Product updated"}
 
@@ -188,14 +183,25 @@ async def update_product(product_id: int, payload: ProductUpdate):
 @router.get("/search")
 async def search_products_endpoint(q: str = Query(..., min_length=1)):
     """
-    Semantic search for products.
+    Semantic search for products. Results are cached until the next catalog write.
+    """
+    from services.embeddings import embed_query
+
+    async def search():
+        vector = await embed_query(q, table="products")
+        return await search_similar_products(vector, top_k=20)
+
+    return await search_cache.cached("items/search", "products", q, 20, search)
+
+@router.get("/{product_id}/alternatives")
+async def product_alternatives(product_id: int, limit: int = Query(10, ge=1, le=50)):
+    """
+    Most similar products to a catalog product, from the precomputed neighbour lists.
     """
-    from services.embeddings import embed_text
-    vector = await embed_text(q)
-    results = await search_similar_products(vector, top_k=20)
-    return results
+    return await neighbors.similar("products", product_id, limit)
 
 @router.post("/embed_all")
 async def embed_all_endpoint():
-    count = await embed_all_products_missing(limit=500)
-    return {"status": "success", "processed": count}
\ No newline at end of file
+    queued = await embedding_jobs.enqueue_missing()
+    # "processed" (total count) kept for existing callers; embedding now happens in the job worker
+    return {"status": "success", "queued": queued, "processed": sum(queued.values())}
\ No newline at end of file
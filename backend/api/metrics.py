@@ -0,0 +1,39 @@
+from fastapi import APIRouter
+
+from core.executor import executor_stats
+from core.rate_limit import limiter_stats
+from services import embedding_cache, embedding_jobs, llm_cache, ml_client, product_index, search_cache
+from services.embeddings import query_cache_stats
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/cache")
+async def cache_metrics():
+    """
+    Hit/miss counters for the in-process caches.
+    """
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "query_embedding_cache": query_cache_stats(),
+        "product_index": product_index.stats(),
+        "search_cache": search_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+    }
+
+
+@router.get("/providers")
+async def provider_metrics():
+    """
+    Queue depth and in-flight counts for blocking provider SDK calls,
+    plus the current adaptive rate and throttle/retry counters per provider/model,
+    and the reused LLM client handles / HTTP connection pools.
+    """
+    return {**executor_stats(), "rate_limits": limiter_stats(), "clients": ml_client.client_stats()}
+
+
+@router.get("/embedding-jobs")
+async def embedding_job_metrics():
+    """
+    Embedding queue depth by table and status, plus rows still missing a vector.
+    """
+    return await embedding_jobs.pending_counts()
@@ -1,10 +1,15 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Query, Body, Path
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import date
+from core.config import get_settings
 from core.database import fetch, execute, fetchval
-from services.embeddings import embed_text
-from core.utils import to_pgvector_literal
+from services.embeddings import embed_query
+from services import embedding_jobs, hybrid_search, search_cache, vector_indexes, vector_storage
+from core.utils import jsonable_row
+
+settings = get_settings()
 
 router = APIRouter(prefix="/opportunities", tags=["opportunities"])
 
@@ -19,16 +24,22 @@ class OpportunityCreate(BaseModel):
 @router.get("/", response_model=List[dict])
 async def list_opportunities():
     rows = await fetch("SELECT * FROM opportunities ORDER BY created_at DESC")
-    return [dict(row) for row in rows]
+    return [jsonable_row(row) for row in rows]
+
+async def _embed_opportunity(op_id: int, payload: OpportunityCreate):
+    # Embed inline so the row is searchable right away; the job queue retries on failure
+    row = {"id": op_id, "client_name": payload.client_name, "project_name": payload.project_name, "notes": payload.notes}
+    try:
+        await embedding_jobs.store_embeddings("opportunities", [row])
+    except Exception as e:
+        print(f"⚠️ Opportunity {op_id} embedding deferred: {e}")
+        await embedding_jobs.enqueue("opportunities", [op_id])
 
 @router.post("/add")
 async def add_opportunity(payload: OpportunityCreate):
-    search_text = f"{payload.client_name} {payload.project_name} {payload.notes}"
-    vector = await embed_text(search_text)
-    
     query = """
-        INSERT INTO opportunities (client_name, project_name, status, expected_rfp_date, estimated_value, notes, embedding)
-        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        INSERT INTO opportunities (client_name, project_name, status, expected_rfp_date, estimated_value, notes)
+        VALUES ($1, $2, $3, $4, $5, $6)
         RETURNING id
     """
     
@@ -39,9 +50,10 @@ async def add_opportunity(payload: OpportunityCreate):
         payload.status,
         payload.expected_rfp_date,
         payload.estimated_value,
-        payload.notes,
-        str(vector) if vector else None
+        payload.notes
     )
+    await _embed_opportunity(op_id, payload)
+    await search_cache.bump("opportunities")
     
     return {"status": "success", "id": op_id}
 
@@ -52,14 +64,10 @@ async def update_opportunity(id: int, payload: OpportunityCreate):
     if not exists:
         raise HTTPException(status_code=404, detail="Opportunity not found")
 
-    # Update embedding if text changed (optional optimization: check diff)
-    search_text = f"{payload.client_name} {payload.project_name} {payload.notes}"
-    vector = await embed_text(search_text)
-
     query = """
         UPDATE opportunities 
-        SET client_name = $1, project_name = $2, status = $3, expected_rfp_date = $4, estimated_value = $5, notes = $6, embedding = $7
-        WHERE id = $8
+        SET client_name = $1, project_name = $2, status = $3, expected_rfp_date = $4, estimated_value = $5, notes = $6
+        WHERE id = $7
     """
     
     await execute(
@@ -70,28 +78,56 @@ async def update_opportunity(id: int, payload: OpportunityCreate):
         payload.expected_rfp_date,
         payload.estimated_value,
         payload.notes,
-        str(vector) if vector else None,
         id
     )
+    await _embed_opportunity(id, payload)
+    await search_cache.bump("opportunities")
     
     return {"status": "success", "id": id}
 
 @router.get("/search")
 async def search_opportunities(q: str = Query(..., min_length=1)):
-    vector = await embed_text(q)
-    vec_literal = to_pgvector_literal(vector)
-    
-    query = f"""
-        SELECT *, 
-        (1 - (embedding <=> {vec_literal})) as similarity
-        FROM opportunities
-        WHERE 
-            client_name ILIKE $1 OR 
-            project_name ILIKE $1 OR 
-            (embedding <=> {vec_literal}) < 0.5
-        ORDER BY similarity DESC
-        LIMIT 20
+    """Hybrid search, cached until the next opportunity write."""
+    return await search_cache.cached("opportunities/search", "opportunities", q, 20, lambda: _search_opportunities(q))
+
+async def _search_opportunities(q: str):
     """
-    
-    rows = await fetch(query, f"%{q}%")
-    return [dict(row) for row in rows]
\ No newline at end of file
+    Hybrid search: a vector top-k leg (served by the ANN index) and a name leg
+    (served by the trigram indexes) run separately and are merged by reciprocal rank.
+    """
+    n = settings.hybrid_candidates
+    names = hybrid_search.TRIGRAM_COLUMNS["opportunities"]
+    vector = await embed_query(q, table="opportunities")
+    vector_rows, text_rows = await asyncio.gather(
+        vector_indexes.search_fetch(
+            "opportunities", vector_storage.nearest_sql("opportunities", "id"), vector, n, top_k=n
+        ),
+        fetch(
+            f"""
+            SELECT id
+            FROM opportunities
+            WHERE {" OR ".join(f"{c} ILIKE $2" for c in names)}
+            ORDER BY {hybrid_search.text_rank_sql(names, "$1::text")}, id
+            LIMIT $3
+            """,
+            q, f"%{q}%", n
+        ),
+    )
+    # The similarity cut-off applies to the index's top-k, not inside the scan, so the index stays usable
+    vector_rows = [r for r in vector_rows if r["similarity"] > 0.5]
+    fused = hybrid_search.rrf_merge([[r["id"] for r in vector_rows], [r["id"] for r in text_rows]], limit=20)
+    if not fused:
+        return []
+
+    similarity = {r["id"]: r["similarity"] for r in vector_rows}
+    rows = {r["id"]: r for r in await fetch(
+        "SELECT * FROM opportunities WHERE id = ANY($1::int[])", [f["id"] for f in fused]
+    )}
+    results = []
+    for f in fused:
+        if f["id"] in rows:
+            row = jsonable_row(rows[f["id"]])
+            row["similarity"] = similarity.get(f["id"])
+            row["score"] = f["rrf_score"]
+            results.append(row)
+    return results
\ No newline at end of file
@@ -11,8 +11,9 @@ from services.pdf_processor import extract_text_from_pdf
 from agents.rfp_agent import run_quotation_flow
 from models.quotation_db import QuotationDB, QuotationUpdate, AuditLogEntry
 from core.database import fetchval, fetch, execute, fetchrow
-from services.vector_search import search_similar_products
-from services.embeddings import embed_text
+from services.vector_search import search_products_with_specs
+from services.product_specs import requirement_constraints
+from services.embeddings import embed_texts
 from core.activity_logger import log_user_activity
 from core.config import get_settings
 
@@ -150,11 +151,16 @@ async def rematch_quotation(id: int, requirements: List[Dict[str, Any]] = Body(.
         content_val = current_row['content']
         content = json.loads(content_val) if isinstance(content_val, str) else content_val
         new_matches = []
+        queries = []
         for req in requirements:
             search_text = (f"{req.get('Fixture_Type', '')} {req.get('Wattage', '')} {req.get('CCT', req.get('Color_Temperature', ''))} {req.get('IP', req.get('IP_Rating', ''))} {req.get('Beam_Angle', '')} {req.get('Lumen_Output', '')} {req.get('Description', req.get('description', ''))}").strip()
             if not search_text: continue
-            embedding = await embed_text(search_text)
-            candidates = await search_similar_products(embedding, top_k=5)
+            queries.append((req, search_text))
+        embeddings = await embed_texts([text for _, text in queries], table="products")
+        all_candidates = await search_products_with_specs(
+            embeddings, [requirement_constraints(req) for req, _ in queries], top_k=5
+        )
+        for (req, _), candidates in zip(queries, all_candidates):
             if candidates:
                 best = candidates[0]
                 alts = candidates[1:3]
@@ -168,6 +174,7 @@ async def rematch_quotation(id: int, requirements: List[Dict[str, Any]] = Body(.
                     "product_title": best.get("title"),
                     "product_description": best.get("description"),
                     "match_score": score,
+                    "spec_match": best.get("spec_match", False),
                     "reasoning": f"Best Match: {best.get('title')} ({score:.2f})",
                     "quantity": qty_val,
                     "unit_price": float(best.get("price", 100.0)),
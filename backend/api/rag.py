@@ -1,11 +1,14 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Body, Header
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
+import json
 import uuid
 from services.pdf_processor import extract_text_from_pdf
 from services.rag_service import process_document, retrieve_context
-from services.ml_client import chat_reasoning
+from services.ml_client import chat_reasoning, chat_reasoning_stream
 from core.database import fetchval, fetch, execute
+from core.utils import sse_event
 from core.activity_logger import log_user_activity
 
 router = APIRouter(prefix="/rag", tags=["rag"])
@@ -71,6 +74,27 @@ async def get_session_history(session_id: str, x_user_email: Optional[str] = Hea
     )
     return [dict(row) for row in rows]
 
+NO_CONTEXT_RESPONSE = "I don't have enough information in the uploaded documents to answer that."
+
+def build_prompt(context: str, query: str) -> str:
+    return f"""
+        You are a helpful assistant answering questions based ONLY on the provided document context.
+        
+        Context:
+        {context}
+        
+        Question: {query}
+        
+        Answer (be concise):
+        """
+
+async def save_message(x_user_id: Optional[int], x_user_email: Optional[str], role: str, content: str, session_id: str):
+    if x_user_email:
+        await execute(
+            "INSERT INTO rag_chat_history (user_id, user_email, role, content, session_id) VALUES ($1, $2, $3, $4, $5)",
+            x_user_id, x_user_email, role, content, session_id
+        )
+
 @router.post("/chat")
 async def chat_with_docs(
     payload: ChatRequest,
@@ -80,35 +104,56 @@ async def chat_with_docs(
     session_id = payload.session_id or str(uuid.uuid4())
     
     # 1. Save User Message
-    if x_user_email:
-        await execute(
-            "INSERT INTO rag_chat_history (user_id, user_email, role, content, session_id) VALUES ($1, $2, 'user', $3, $4)",
-            x_user_id, x_user_email, payload.query, session_id
-        )
+    await save_message(x_user_id, x_user_email, "user", payload.query, session_id)
 
     # 2. Retrieve & Generate
     context = await retrieve_context(payload.query)
     
     if not context:
-        response_text = "I don't have enough information in the uploaded documents to answer that."
+        response_text = NO_CONTEXT_RESPONSE
     else:
-        prompt = f"""
-        You are a helpful assistant answering questions based ONLY on the provided document context.
-        
-        Context:
-        {context}
-        
-        Question: {payload.query}
-        
-        Answer (be concise):
-        """
-        response_text = await chat_reasoning(prompt)
+        response_text = await chat_reasoning(build_prompt(context, payload.query))
 
     # 3. Save Bot Response
-    if x_user_email:
-        await execute(
-            "INSERT INTO rag_chat_history (user_id, user_email, role, content, session_id) VALUES ($1, $2, 'bot', $3, $4)",
-            x_user_id, x_user_email, response_text, session_id
-        )
+    await save_message(x_user_id, x_user_email, "bot", response_text, session_id)
 
-    return {"response": response_text, "session_id": session_id}
\ No newline at end of file
+    return {"response": response_text, "session_id": session_id}
+
+@router.post("/chat/stream")
+async def chat_with_docs_stream(
+    payload: ChatRequest,
+    x_user_id: Optional[int] = Header(None),
+    x_user_email: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events version of /chat: `meta` (session id), then one `token` event
+    per chunk as the model produces it, then `done` with the full answer. The bot
+    message is saved once the stream completes; an aborted stream saves nothing.
+    """
+    session_id = payload.session_id or str(uuid.uuid4())
+    await save_message(x_user_id, x_user_email, "user", payload.query, session_id)
+
+    async def events():
+        yield sse_event("meta", json.dumps({"session_id": session_id}))
+        try:
+            context = await retrieve_context(payload.query)
+            if not context:
+                parts = [NO_CONTEXT_RESPONSE]
+                yield sse_event("token", json.dumps({"text": NO_CONTEXT_RESPONSE}))
+            else:
+                parts = []
+                async for text in chat_reasoning_stream(build_prompt(context, payload.query)):
+                    parts.append(text)
+                    yield sse_event("token", json.dumps({"text": text}))
+            response_text = "".join(parts)
+            await save_message(x_user_id, x_user_email, "bot", response_text, session_id)
+            yield sse_event("done", json.dumps({"response": response_text, "session_id": session_id}))
+        except Exception as e:
+            print(f"RAG stream error: {e}")
+            yield sse_event("error", json.dumps({"detail": str(e)}))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
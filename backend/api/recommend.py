@@ -1,13 +1,19 @@
 from typing import List, Any
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 
 # Absolute imports
 from services.recommend_flow import generate_recommendations
 from models.recommendations import Recommendation, RecommendationResponse
 from models.items import Item
+from services import neighbors
 
 router = APIRouter(prefix="/recommend", tags=["recommend"])
 
+@router.get("/items/{item_id}/similar")
+async def similar_items(item_id: int, limit: int = Query(10, ge=1, le=50)) -> Any:
+    """Courses most similar to `item_id`, from the precomputed neighbour lists."""
+    return await neighbors.similar("items", item_id, limit)
+
 @router.get("/{user_id}", response_model=RecommendationResponse)
 async def recommend_for_user(user_id: int) -> Any:
     result = await generate_recommendations(user_id=user_id, top_k=20)
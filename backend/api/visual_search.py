@@ -2,7 +2,11 @@ from fastapi import APIRouter, UploadFile, File, HTTPException
 from typing import List, Dict, Any
 import google.generativeai as genai
 from core.config import get_settings
+from core.executor import run_blocking
+from core.rate_limit import limited_call
+from services.ml_client import gemini_model
 from services.vector_search import search_similar_products
+from services.embeddings import embed_query
 from PIL import Image
 import io
 
@@ -28,10 +32,13 @@ async def visual_search(file: UploadFile = File(...)):
         # Step 1: Use a Vision model to describe the image
         # This is more robust than direct image embedding if the specific embedding model 
         # doesn't support images or if the library version is older.
-        vision_model = genai.GenerativeModel('gemini-2.0-flash') # Or gemini-1.5-flash
+        vision_model = gemini_model('gemini-2.0-flash') # Or gemini-1.5-flash
         
         prompt = "Describe this lighting fixture in detail for a product catalog search. Include fixture type, material, color, estimated wattage usage context, and style."
-        response = vision_model.generate_content([prompt, image])
+        response = await limited_call(
+            "google", vision_model.model_name,
+            run_blocking, "google", vision_model.generate_content, [prompt, image]
+        )
         
         if not response.text:
              raise HTTPException(status_code=500, detail="Failed to analyze image")
@@ -40,17 +47,11 @@ async def visual_search(file: UploadFile = File(...)):
         print(f"📷 Image analysis: {description[:100]}...")
 
         # Step 2: Embed the generated description
-        # Now we are embedding text, which is guaranteed to work with embedding-001
-        result = genai.embed_content(
-            model="models/embedding-001",
-            content=description,
-            task_type="retrieval_query"
-        )
+        # Uses the same model as the stored product vectors so distances are comparable
+        embedding = await embed_query(description, table="products")
         
-        if not result or 'embedding' not in result:
+        if embedding is None or not len(embedding):
              raise HTTPException(status_code=500, detail="Failed to generate embedding from description")
-             
-        embedding = result['embedding']
         
         # Step 3: Search database
         products = await search_similar_products(embedding, top_k=10)
@@ -22,6 +22,77 @@ class Settings(BaseSettings):
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     google_api_key: str = os.getenv("GOOGLE_API_KEY", "")
     tavily_api_key: str = os.getenv("TAVILY_API_KEY", "")
+    # Max inputs packed into one provider embedding request (Gemini caps at 100)
+    embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", 100))
+    # In-process entries kept in front of the embedding_cache table
+    embedding_cache_size: int = int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))
+    # Deterministic (temperature 0) chat responses: in-process entries + llm_cache table (on | off)
+    llm_cache: str = os.getenv("LLM_CACHE", "on")
+    llm_cache_size: int = int(os.getenv("LLM_CACHE_SIZE", 1024))
+    llm_cache_ttl_seconds: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", 604800))
+    # Search query embeddings (in-process only)
+    query_cache_size: int = int(os.getenv("QUERY_CACHE_SIZE", 2048))
+    query_cache_ttl_seconds: int = int(os.getenv("QUERY_CACHE_TTL_SECONDS", 3600))
+    # Search results keyed on catalog version; writes invalidate, the TTL only bounds memory age
+    search_cache_size: int = int(os.getenv("SEARCH_CACHE_SIZE", 2048))
+    search_cache_ttl_seconds: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", 86400))
+    # How quickly a write in another process invalidates this process's cached results
+    search_cache_version_refresh_seconds: int = int(os.getenv("SEARCH_CACHE_VERSION_REFRESH_SECONDS", 5))
+    # Thread pool for blocking provider SDK calls, and per-provider in-flight cap
+    provider_executor_workers: int = int(os.getenv("PROVIDER_EXECUTOR_WORKERS", 16))
+    provider_max_concurrency: int = int(os.getenv("PROVIDER_MAX_CONCURRENCY", 8))
+    # Separate pool for CPU-bound index builds (ANN graph, neighbour lists, product families)
+    index_executor_workers: int = int(os.getenv("INDEX_EXECUTOR_WORKERS", 2))
+    # Adaptive per provider/model rate limit (requests/sec ceiling) and retries on 429/5xx
+    provider_rate_limit: float = float(os.getenv("PROVIDER_RATE_LIMIT", 10))
+    provider_rate_limits: str = os.getenv("PROVIDER_RATE_LIMITS", "")
+    provider_burst: int = int(os.getenv("PROVIDER_BURST", 10))
+    provider_max_retries: int = int(os.getenv("PROVIDER_MAX_RETRIES", 6))
+    provider_retry_base_seconds: float = float(os.getenv("PROVIDER_RETRY_BASE_SECONDS", 0.5))
+    provider_retry_max_seconds: float = float(os.getenv("PROVIDER_RETRY_MAX_SECONDS", 60))
+    # LLM clients: GenerativeModel handles kept, and keep-alive HTTP pool per provider
+    llm_model_cache_size: int = int(os.getenv("LLM_MODEL_CACHE_SIZE", 64))
+    llm_http_max_connections: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 20))
+    llm_http_max_keepalive: int = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", 10))
+    llm_http_keepalive_seconds: float = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", 60))
+    llm_http_timeout_seconds: float = float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", 120))
+    # Background embedding job queue
+    embedding_job_poll_seconds: float = float(os.getenv("EMBEDDING_JOB_POLL_SECONDS", 5))
+    embedding_job_max_attempts: int = int(os.getenv("EMBEDDING_JOB_MAX_ATTEMPTS", 8))
+    embedding_job_backoff_seconds: float = float(os.getenv("EMBEDDING_JOB_BACKOFF_SECONDS", 10))
+    embedding_job_visibility_seconds: int = int(os.getenv("EMBEDDING_JOB_VISIBILITY_SECONDS", 600))
+    # Quantized vector copy used for candidate search: full | halfvec | binary
+    vector_storage_mode: str = os.getenv("VECTOR_STORAGE_MODE", "full")
+    vector_rescore_oversample: int = int(os.getenv("VECTOR_RESCORE_OVERSAMPLE", 4))
+    embedding_model_refresh_seconds: int = int(os.getenv("EMBEDDING_MODEL_REFRESH_SECONDS", 10))
+    # In-process ANN index over products for RFP matching: off | memory
+    product_index: str = os.getenv("PRODUCT_INDEX", "off")
+    product_index_ef_search: int = int(os.getenv("PRODUCT_INDEX_EF_SEARCH", 64))
+    product_index_refresh_seconds: int = int(os.getenv("PRODUCT_INDEX_REFRESH_SECONDS", 300))
+    # Managed ANN indexes: none below min rows, HNSW up to max rows, ivfflat beyond
+    vector_index_min_rows: int = int(os.getenv("VECTOR_INDEX_MIN_ROWS", 1000))
+    vector_index_hnsw_max_rows: int = int(os.getenv("VECTOR_INDEX_HNSW_MAX_ROWS", 2000000))
+    vector_index_growth_factor: float = float(os.getenv("VECTOR_INDEX_GROWTH_FACTOR", 4))
+    vector_index_check_seconds: int = int(os.getenv("VECTOR_INDEX_CHECK_SECONDS", 3600))
+    # Precomputed neighbour lists for items and products ("similar" / "alternatives")
+    neighbors_k: int = int(os.getenv("NEIGHBORS_K", 20))
+    neighbors_batch_size: int = int(os.getenv("NEIGHBORS_BATCH_SIZE", 512))
+    neighbors_refresh_seconds: int = int(os.getenv("NEIGHBORS_REFRESH_SECONDS", 60))
+    # Per-query ef_search / probes: fast | balanced | accurate
+    vector_search_profile: str = os.getenv("VECTOR_SEARCH_PROFILE", "balanced")
+    # RFP matching: allowed relative wattage deviation for the SQL spec pre-filter
+    spec_wattage_tolerance: float = float(os.getenv("SPEC_WATTAGE_TOLERANCE", 0.15))
+    # Product families: variants of one fixture clustered together for two-stage matching
+    product_families: str = os.getenv("PRODUCT_FAMILIES", "on")
+    product_family_similarity: float = float(os.getenv("PRODUCT_FAMILY_SIMILARITY", 0.92))
+    product_family_candidates: int = int(os.getenv("PRODUCT_FAMILY_CANDIDATES", 20))
+    # Hybrid search: reciprocal rank fusion constant and candidates fetched per leg
+    hybrid_rrf_k: int = int(os.getenv("HYBRID_RRF_K", 60))
+    hybrid_candidates: int = int(os.getenv("HYBRID_CANDIDATES", 50))
+    rag_lexical_weight: float = float(os.getenv("RAG_LEXICAL_WEIGHT", 1.0))
+    rag_vector_weight: float = float(os.getenv("RAG_VECTOR_WEIGHT", 1.0))
+    # Recommendation explanations: one JSON call for the top items (on) or one call per item, in parallel (off)
+    explanation_batch: str = os.getenv("EXPLANATION_BATCH", "on")
 
     # Email Settings (SMTP)
     mail_username: str = os.getenv("MAIL_USERNAME", "apikey")
@@ -1,9 +1,44 @@
+import struct
 import asyncpg
+import numpy as np
 from typing import Any, List, Optional
 from .config import get_settings
 
 pool: Optional[asyncpg.Pool] = None
 
+# pgvector binary wire format: int16 dim, int16 unused, then dim big-endian float4
+_VECTOR_HEADER = struct.Struct(">HH")
+
+def _encode_vector(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    arr = np.asarray(value, dtype=">f4")
+    return _VECTOR_HEADER.pack(arr.shape[0], 0) + arr.tobytes()
+
+def vector_array(vectors: List[Any]) -> List[bytes]:
+    """
+    Argument for a vector[] parameter. asyncpg would walk into each numpy array as an
+    extra array dimension, so the elements are passed pre-encoded.
+    """
+    return [_encode_vector(v) for v in vectors]
+
+def _decode_vector(data: bytes) -> np.ndarray:
+    dim, _ = _VECTOR_HEADER.unpack_from(data)
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=_VECTOR_HEADER.size).astype(np.float32)
+
+async def _init_connection(conn: asyncpg.Connection):
+    """
+    Register a binary codec for pgvector's `vector` type, so embeddings cross the
+    wire as raw float32 and come back as numpy arrays instead of text literals.
+    """
+    schema = await conn.fetchval(
+        "SELECT n.nspname FROM pg_type t JOIN pg_namespace n ON n.oid = t.typnamespace WHERE t.typname = 'vector'"
+    )
+    if schema:
+        await conn.set_type_codec(
+            "vector", schema=schema, encoder=_encode_vector, decoder=_decode_vector, format="binary"
+        )
+
 async def init_pool():
     global pool
     settings = get_settings()
@@ -12,7 +47,7 @@ async def init_pool():
         dsn = f"postgresql://{settings.postgres_user}:{settings.postgres_password}@{settings.postgres_server}:{settings.postgres_port}/{settings.postgres_db}"
     
     try:
-        pool = await asyncpg.create_pool(dsn)
+        pool = await asyncpg.create_pool(dsn, init=_init_connection)
         print("✅ Database connection pool created")
     except Exception as e:
         print(f"❌ Failed to create database pool: {e}")
@@ -57,4 +92,10 @@ async def execute(query: str, *args) -> str:
     """Execute a command (INSERT, UPDATE, DELETE)."""
     pool = await get_db_pool()
     async with pool.acquire() as conn:
-        return await conn.execute(query, *args)
\ No newline at end of file
+        return await conn.execute(query, *args)
+
+async def executemany(query: str, args: List[tuple]) -> None:
+    """Execute a command once per argument tuple in a single round trip."""
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        await conn.executemany(query, args)
\ No newline at end of file
@@ -0,0 +1,73 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from .config import get_settings
+
+settings = get_settings()
+
+# Dedicated pool for blocking provider SDK calls (genai.embed_content, generate_content, ...)
+# so they never run on, or starve, the default loop executor.
+_executor = ThreadPoolExecutor(
+    max_workers=settings.provider_executor_workers,
+    thread_name_prefix="provider-sdk",
+)
+
+# CPU-bound numpy/hnswlib work (index builds, neighbour lists, clustering) runs here,
+# off the provider pool so it never takes SDK threads or per-provider permits.
+_index_executor = ThreadPoolExecutor(
+    max_workers=settings.index_executor_workers,
+    thread_name_prefix="index",
+)
+
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+_stats: Dict[str, Dict[str, int]] = {}
+
+def _provider_state(provider: str):
+    if provider not in _semaphores:
+        _semaphores[provider] = asyncio.Semaphore(settings.provider_max_concurrency)
+        _stats[provider] = {"queued": 0, "running": 0, "completed": 0, "failed": 0, "max_queued": 0}
+    return _semaphores[provider], _stats[provider]
+
+async def run_blocking(provider: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a synchronous provider SDK call in the bounded executor.
+    At most `provider_max_concurrency` calls per provider run at once; the rest queue here.
+    """
+    sem, stats = _provider_state(provider)
+    stats["queued"] += 1
+    stats["max_queued"] = max(stats["max_queued"], stats["queued"])
+    try:
+        await sem.acquire()
+    finally:
+        stats["queued"] -= 1
+
+    stats["running"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+        stats["completed"] += 1
+        return result
+    except Exception:
+        stats["failed"] += 1
+        raise
+    finally:
+        stats["running"] -= 1
+        sem.release()
+
+async def run_index(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a CPU-bound index build in the dedicated index pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_index_executor, functools.partial(fn, *args, **kwargs))
+
+def executor_stats() -> Dict[str, Any]:
+    return {
+        "max_workers": settings.provider_executor_workers,
+        "max_concurrency_per_provider": settings.provider_max_concurrency,
+        "index_workers": settings.index_executor_workers,
+        "providers": {name: dict(s) for name, s in _stats.items()},
+    }
+
+def shutdown_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
+    _index_executor.shutdown(wait=False, cancel_futures=True)
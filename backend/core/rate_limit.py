@@ -0,0 +1,153 @@
+import asyncio
+import email.utils
+import random
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from .config import get_settings
+
+settings = get_settings()
+
+# Statuses worth retrying: throttling, timeouts and transient server errors
+_RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+# SDK errors that carry no status code but are transient
+_RETRY_ERRORS = {"APIConnectionError", "APITimeoutError", "DeadlineExceeded", "ServiceUnavailable"}
+# Gemini reports its back-off hint in the message body rather than a header
+_GOOGLE_RETRY_RE = re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)|retry in ([\d.]+)\s*s", re.IGNORECASE)
+
+def _parse_overrides(raw: str) -> Dict[str, float]:
+    """'google/models/text-embedding-004=25,openai=60' -> {key: requests per second}"""
+    overrides = {}
+    for part in raw.split(","):
+        if "=" in part:
+            key, value = part.rsplit("=", 1)
+            overrides[key.strip()] = float(value)
+    return overrides
+
+_overrides = _parse_overrides(settings.provider_rate_limits)
+
+class TokenBucket:
+    """
+    Token bucket whose refill rate adapts to the provider: halved on every throttle
+    (and paused for Retry-After), nudged back up towards the configured ceiling on success.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.min_rate = rate / 64
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self.stats = {"calls": 0, "throttled": 0, "retries": 0, "failures": 0}
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def on_throttle(self, retry_after: Optional[float]):
+        self.stats["throttled"] += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+def _bucket(provider: str, model: str) -> TokenBucket:
+    key = (provider, model)
+    if key not in _buckets:
+        rate = _overrides.get(f"{provider}/{model}", _overrides.get(provider, settings.provider_rate_limit))
+        _buckets[key] = TokenBucket(rate, settings.provider_burst)
+    return _buckets[key]
+
+def _status(error: Exception) -> Optional[int]:
+    for source in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "code"):
+            value = getattr(source, attr, None)
+            # grpc errors expose code() as a method; only HTTP-style ints count here
+            if isinstance(value, int):
+                return int(value)
+    return None
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    value = headers.get("retry-after") if headers else None
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    match = _GOOGLE_RETRY_RE.search(str(error))
+    if match:
+        return float(match.group(1) or match.group(2))
+    return None
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in _RETRY_ERRORS:
+        return True
+    return _status(error) in _RETRY_STATUSES
+
+async def limited_call(provider: str, model: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+    """
+    Await fn(*args, **kwargs) under the (provider, model) rate limit.
+    429/5xx/timeouts are retried with full-jitter exponential backoff, or after the
+    provider's Retry-After when it sends one; other errors, and the last failure, propagate.
+    """
+    bucket = _bucket(provider, model)
+    attempt = 0
+    while True:
+        await bucket.acquire()
+        bucket.stats["calls"] += 1
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e) or attempt >= settings.provider_max_retries:
+                bucket.stats["failures"] += 1
+                raise
+            retry_after = _retry_after(e)
+            if _status(e) == 429 or retry_after:
+                bucket.on_throttle(retry_after)
+            backoff = min(settings.provider_retry_max_seconds, settings.provider_retry_base_seconds * (2 ** attempt))
+            delay = retry_after if retry_after is not None else random.uniform(0, backoff)
+            attempt += 1
+            bucket.stats["retries"] += 1
+            print(f"⚠️ {provider}/{model} call failed ({e}); retry {attempt} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        bucket.on_success()
+        return result
+
+def limiter_stats() -> Dict[str, Any]:
+    return {
+        f"{provider}/{model}": {
+            "rate_per_second": round(b.rate, 3),
+            "max_rate_per_second": b.max_rate,
+            **b.stats,
+        }
+        for (provider, model), b in _buckets.items()
+    }
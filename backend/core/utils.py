@@ -1,13 +1,19 @@
 from datetime import datetime, timezone
-from typing import Iterable, List
+from typing import Any, Dict, List, Mapping
+
+import numpy as np
 
 
 def now_utc() -> datetime:
 	return datetime.now(timezone.utc)
 
 
-def to_pgvector_literal(vec: Iterable[float]) -> str:
-	# pgvector accepts '[v1, v2, ...]' literal; we keep limited precision for size
-	return "[" + ",".join(f"{float(v):.6f}" for v in vec) + "]"
+def jsonable_row(row: Mapping[str, Any]) -> Dict[str, Any]:
+	# Vector columns decode to numpy arrays; API responses never need them
+	return {k: v for k, v in row.items() if not isinstance(v, np.ndarray)}
 
 
+def sse_event(event: str, data: str) -> str:
+	# One Server-Sent Events frame; multi-line payloads need one data: line each
+	lines = "\n".join(f"data: {line}" for line in data.split("\n"))
+	return f"event: {event}\n{lines}\n\n"
@@ -6,7 +6,8 @@ import uvicorn
 
 # Absolute imports
 from core.config import get_settings
-from core.database import init_pool, close_pool, fetchval
+from core.database import init_pool, close_pool
+from core.executor import shutdown_executor
 from api.recommend import router as recommend_router
 from api.items import router as items_router
 from api.users import router as users_router
@@ -20,32 +21,77 @@ from api.email_bot import router as email_bot_router
 import api.visual_search as visual_search   # Visual Search Module
 import api.external_search as external_search   # External Search Module
 from api.db_chat import router as db_chat_router  # <--- Add this
+from api.metrics import router as metrics_router
+from api.admin import router as admin_router
 
 # New Import
 from api.rag import router as rag_router 
-from services.embeddings import embed_all_items_missing, embed_all_products_missing
+from services.embedding_cache import ensure_embedding_cache_table
+from services.llm_cache import ensure_llm_cache_table
+from services import (
+    embedding_jobs, embedding_models, hybrid_search, neighbors, product_families, product_index, product_specs, search_cache,
+    vector_indexes, vector_storage
+)
+from services.embeddings import warm_up as warm_up_embeddings
+from services.ml_client import close_clients, warm_up_clients
+from services.rag_service import ensure_rag_search_column
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_pool()
-    async def check_embeddings():
-        try:
-            missing_items = await fetchval("SELECT COUNT(*) FROM items WHERE embedding IS NULL")
-            if missing_items and missing_items > 0:
-                print(f"🔄 Found {missing_items} items missing embeddings...")
-                await embed_all_items_missing(limit=100)
+    await ensure_embedding_cache_table()
+    await ensure_llm_cache_table()
+    await embedding_models.ensure_embedding_model_tables()
+    await product_specs.ensure_product_spec_columns()
+    await product_families.ensure_product_family_tables()
+    await hybrid_search.ensure_trigram_indexes()
+    await ensure_rag_search_column()
+    await search_cache.ensure_search_versions_table()
+    await warm_up_embeddings()
+    await warm_up_clients()
+    try:
+        await vector_storage.detect_quantized_tables()
+        await vector_indexes.ensure_vector_index_table()
+        await vector_indexes.refresh()
+        await vector_storage.check_index_usage()
+    except Exception as e:
+        print(f"⚠️ Vector storage check warning: {e}")
+    await embedding_jobs.ensure_embedding_jobs_table()
+    await neighbors.ensure_neighbor_tables()
+    try:
+        await product_families.refresh()
+        if not product_families.enabled() and get_settings().product_families.lower() == "on":
+            built = await product_families.rebuild()
+            if built["families"]:
+                print(f"✅ Grouped {built['products']} products into {built['families']} families")
+    except Exception as e:
+        print(f"⚠️ Product families not built, matching stays flat: {e}")
+    try:
+        queued = await embedding_jobs.enqueue_missing()
+        if any(queued.values()):
+            print(f"🔄 Queued missing embeddings: {queued}")
+    except Exception as e:
+        print(f"⚠️ Startup check warning: {e}")
 
-            has_products = await fetchval("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'products')")
-            if has_products:
-                missing_prods = await fetchval("SELECT COUNT(*) FROM products WHERE embedding IS NULL")
-                if missing_prods and missing_prods > 0:
-                     print(f"🔄 Found {missing_prods} products missing embeddings...")
-                     await embed_all_products_missing(limit=500)
+    # Drains embedding_jobs; safe to run in every worker process (SKIP LOCKED)
+    stop_worker = asyncio.Event()
+    workers = [
+        asyncio.create_task(embedding_jobs.run_worker(stop_worker)),
+        asyncio.create_task(vector_indexes.run_maintainer(stop_worker)),
+        asyncio.create_task(neighbors.run_builder(stop_worker)),
+    ]
+    if product_index.enabled():
+        try:
+            await product_index.load()
         except Exception as e:
-            print(f"⚠️ Startup check warning: {e}")
-    asyncio.create_task(check_embeddings())
+            print(f"⚠️ Product index not loaded, matching falls back to Postgres: {e}")
+        workers.append(asyncio.create_task(product_index.run_refresher(stop_worker)))
     yield
+    stop_worker.set()
+    await asyncio.gather(*workers)
+    await close_clients()
     await close_pool()
+    shutdown_executor()
 
 def create_app() -> FastAPI:
     app = FastAPI(title="Project Phoenix Backend", version="2.0", lifespan=lifespan)
@@ -69,6 +115,8 @@ def create_app() -> FastAPI:
     app.include_router(db_chat_router)  # <--- Register DB Chat
     # Register RAG
     app.include_router(rag_router)
+    app.include_router(metrics_router)
+    app.include_router(admin_router)
 
     @app.get("/")
     async def root(): return {"status": "ok", "system": "Project Phoenix"}
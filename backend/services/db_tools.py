@@ -1,3 +1,4 @@
+import numpy as np
 from typing import List, Dict, Any, Optional
 from core.database import fetch, execute, fetchval
 
@@ -34,7 +35,11 @@ async def execute_query(query: str, params: list = None) -> List[Dict[str, Any]]
     if params is None:
         params = []
     rows = await fetch(query, *params)
-    return [dict(r) for r in rows]
+    # Vector columns arrive as numpy arrays; hand back plain lists for JSON callers
+    return [
+        {k: (v.tolist() if isinstance(v, np.ndarray) else v) for k, v in r.items()}
+        for r in rows
+    ]
 
 async def execute_write(query: str, params: list = None) -> str:
     """Execute INSERT/UPDATE/DELETE."""
@@ -1,13 +1,13 @@
 from typing import Iterable, List, Optional
 
+import numpy as np
+
 try:
 	from .ml_client import get_embedding
 	from ..core.database import fetch, fetchrow, execute
-	from ..core.utils import to_pgvector_literal
 except ImportError:
 	from services.ml_client import get_embedding
 	from core.database import fetch, fetchrow, execute
-	from core.utils import to_pgvector_literal
 
 
 async def embed_text(text: str) -> List[float]:
@@ -16,15 +16,14 @@ async def embed_text(text: str) -> List[float]:
 
 async def embed_and_store_user(user_id: int, summary_text: str) -> List[float]:
 	vec = await embed_text(summary_text)
-	vec_lit = to_pgvector_literal(vec)
 	await execute(
 		"""
 		INSERT INTO embeddings_users (user_id, embedding)
-		VALUES ($1, $2::vector)
+		VALUES ($1, $2)
 		ON CONFLICT (user_id) DO UPDATE SET embedding = EXCLUDED.embedding
 		""",
 		int(user_id),
-		vec_lit,
+		np.asarray(vec, dtype=np.float32),
 	)
 	return vec
 
@@ -33,22 +32,15 @@ async def get_cached_user_embedding(user_id: int) -> Optional[List[float]]:
 	row = await fetchrow("SELECT embedding FROM embeddings_users WHERE user_id = $1", int(user_id))
 	if not row or row["embedding"] is None:
 		return None
-	# asyncpg returns vector as string like '[..]'; parse to floats
-	raw = row["embedding"]
-	if isinstance(raw, str):
-		raw = raw.strip().strip("[]")
-		if not raw:
-			return None
-		return [float(x) for x in raw.split(",")]
-	return None
+	# The pool's vector codec decodes to a float32 numpy array
+	return row["embedding"].tolist()
 
 
 async def embed_and_store_item(item_id: int, text: str) -> None:
 	vec = await embed_text(text)
-	vec_lit = to_pgvector_literal(vec)
 	await execute(
-		"UPDATE items SET embedding = $1::vector WHERE id = $2",
-		vec_lit,
+		"UPDATE items SET embedding = $1 WHERE id = $2",
+		np.asarray(vec, dtype=np.float32),
 		int(item_id),
 	)
 
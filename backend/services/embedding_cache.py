@@ -0,0 +1,91 @@
+import hashlib
+import numpy as np
+from typing import Dict, List
+from core.cache import LRUCache
+from core.config import get_settings
+from core.database import fetch, execute, executemany
+
+settings = get_settings()
+
+# Hot tier in front of the embedding_cache table
+_memory = LRUCache(maxsize=settings.embedding_cache_size)
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so cosmetic differences share one cache entry."""
+    return " ".join(text.split())
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+async def ensure_embedding_cache_table():
+    """Automatically create the embedding cache table if it doesn't exist."""
+    try:
+        await execute("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                embedding REAL[] NOT NULL,
+                created_at TIMESTAMPTZ DEFAULT NOW(),
+                PRIMARY KEY (provider, model, text_hash)
+            );
+        """)
+    except Exception as e:
+        print(f"Warning: Could not check/create embedding_cache table: {e}")
+
+async def get_many(provider: str, model: str, texts: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Look up cached embeddings for texts. Returns {text: vector} for hits only.
+    Checks the in-process LRU first, then the Postgres table.
+    """
+    found: Dict[str, np.ndarray] = {}
+    pending: Dict[str, str] = {}
+    for text in texts:
+        h = text_hash(text)
+        vector = _memory.get((provider, model, h))
+        if vector is not None:
+            found[text] = vector
+        else:
+            pending[h] = text
+
+    if pending:
+        try:
+            rows = await fetch(
+                """
+                SELECT text_hash, embedding FROM embedding_cache
+                WHERE provider = $1 AND model = $2 AND text_hash = ANY($3::text[])
+                """,
+                provider, model, list(pending.keys())
+            )
+            for row in rows:
+                vector = np.asarray(row["embedding"], dtype=np.float32)
+                _memory.set((provider, model, row["text_hash"]), vector)
+                found[pending[row["text_hash"]]] = vector
+        except Exception as e:
+            print(f"Embedding cache lookup failed: {e}")
+
+    return found
+
+async def put_many(provider: str, model: str, vectors: Dict[str, np.ndarray]):
+    """Store freshly computed embeddings in both cache tiers."""
+    if not vectors:
+        return
+    records = []
+    for text, vector in vectors.items():
+        h = text_hash(text)
+        _memory.set((provider, model, h), vector)
+        records.append((provider, model, h, np.asarray(vector, dtype=np.float32).tolist()))
+    try:
+        await executemany(
+            """
+            INSERT INTO embedding_cache (provider, model, text_hash, embedding)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (provider, model, text_hash) DO NOTHING
+            """,
+            records
+        )
+    except Exception as e:
+        print(f"Embedding cache write failed: {e}")
+
+def stats() -> Dict[str, float]:
+    return _memory.stats()
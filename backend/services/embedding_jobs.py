@@ -0,0 +1,265 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List
+from core.config import get_settings
+from core.database import get_db_pool, fetch, fetchval, execute, executemany
+from services.embeddings import embed_texts, product_search_text
+from services import embedding_models, neighbors, product_families, product_index, search_cache
+
+settings = get_settings()
+
+# Tables the worker knows how to embed: the columns their source text is built from.
+SOURCE_COLUMNS = {
+    "items": "id, title, description",
+    "products": "id, title, description, fixture_type, wattage, cct, ip_rating",
+    "opportunities": "id, client_name, project_name, notes",
+    "rag_chunks": "id, content",
+}
+
+def source_text(table: str, row: Dict[str, Any]) -> str:
+    if table == "items":
+        return f"{row['title']} {row['description']}"
+    if table == "products":
+        return product_search_text(row)
+    if table == "opportunities":
+        return f"{row['client_name']} {row['project_name']} {row['notes'] or ''}"
+    return row["content"] or ""
+
+async def store_embeddings(table: str, rows: List[Dict[str, Any]]):
+    """
+    Embed rows with the model serving `table` and write vector + model tag.
+    While a re-embed migration is running, also dual-write the target model's vector
+    to embedding_next so rows changed mid-migration are not left behind.
+    """
+    if not rows:
+        return
+    texts = [source_text(table, r) for r in rows]
+    model = await embedding_models.active_model(table)
+    vectors = await embed_texts(texts, model=model)
+    await executemany(
+        f"UPDATE {table} SET embedding = $1, embedding_model = $2 WHERE id = $3",
+        [(v, model, r["id"]) for r, v in zip(rows, vectors)]
+    )
+    if table == "products":
+        await product_index.refresh(r["id"] for r in rows)
+        await product_families.assign(r["id"] for r in rows)
+    await search_cache.bump(table)
+    await neighbors.mark_changed(table, [r["id"] for r in rows])
+
+    target = await embedding_models.migration_target(table)
+    if target and target != model:
+        next_vectors = await embed_texts(texts, model=target)
+        await executemany(
+            f"UPDATE {table} SET embedding_next = $1 WHERE id = $2",
+            [(v, r["id"]) for r, v in zip(rows, next_vectors)]
+        )
+
+async def ensure_embedding_jobs_table():
+    """Automatically create the embedding job queue if it doesn't exist."""
+    try:
+        await execute("""
+            CREATE TABLE IF NOT EXISTS embedding_jobs (
+                id BIGSERIAL PRIMARY KEY,
+                target_table TEXT NOT NULL,
+                target_id INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                locked_at TIMESTAMPTZ,
+                created_at TIMESTAMPTZ DEFAULT NOW(),
+                UNIQUE (target_table, target_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_embedding_jobs_pending
+                ON embedding_jobs (run_after) WHERE status = 'pending';
+        """)
+    except Exception as e:
+        print(f"Warning: Could not check/create embedding_jobs table: {e}")
+
+    # Partial indexes keep "embedding IS NULL" counts and sweeps off the heap
+    for table in SOURCE_COLUMNS:
+        try:
+            await execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_embedding_missing_idx ON {table} (id) WHERE embedding IS NULL"
+            )
+        except Exception as e:
+            print(f"Warning: Could not create missing-embedding index on {table}: {e}")
+
+    # Items are seeded/inserted with plain SQL, so queue them from a trigger
+    try:
+        await execute("""
+            CREATE OR REPLACE FUNCTION enqueue_item_embedding() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE' OR NEW.embedding IS NULL THEN
+                    INSERT INTO embedding_jobs (target_table, target_id)
+                    VALUES ('items', NEW.id)
+                    ON CONFLICT (target_table, target_id) DO UPDATE
+                    SET status = 'pending', attempts = 0, last_error = NULL, run_after = NOW(), locked_at = NULL;
+                END IF;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_trigger
+                    WHERE tgname = 'items_enqueue_embedding' AND tgrelid = 'items'::regclass
+                ) THEN
+                    CREATE TRIGGER items_enqueue_embedding
+                        AFTER INSERT OR UPDATE OF title, description ON items
+                        FOR EACH ROW EXECUTE FUNCTION enqueue_item_embedding();
+                END IF;
+            END $$;
+        """)
+    except Exception as e:
+        print(f"Warning: Could not create items embedding trigger: {e}")
+
+async def enqueue(table: str, ids: Iterable[int]):
+    """
+    Queue rows for (re-)embedding. Re-enqueueing a queued row resets its retry state.
+    """
+    if table not in SOURCE_COLUMNS:
+        raise ValueError(f"Unsupported embedding target: {table}")
+    ids = list(ids)
+    if not ids:
+        return
+    await execute(
+        """
+        INSERT INTO embedding_jobs (target_table, target_id)
+        SELECT $1, unnest($2::int[])
+        ON CONFLICT (target_table, target_id) DO UPDATE
+        SET status = 'pending', attempts = 0, last_error = NULL, run_after = NOW(), locked_at = NULL
+        """,
+        table, ids
+    )
+
+async def enqueue_missing() -> Dict[str, int]:
+    """Queue every row that still has no embedding (cheap thanks to the partial indexes)."""
+    queued = {}
+    for table in SOURCE_COLUMNS:
+        status = await execute(
+            f"""
+            INSERT INTO embedding_jobs (target_table, target_id)
+            SELECT '{table}', id FROM {table} WHERE embedding IS NULL
+            ON CONFLICT (target_table, target_id) DO NOTHING
+            """
+        )
+        queued[table] = int(status.split()[-1])
+    return queued
+
+async def pending_counts() -> Dict[str, Any]:
+    rows = await fetch(
+        "SELECT target_table, status, COUNT(*) AS n FROM embedding_jobs GROUP BY target_table, status"
+    )
+    jobs: Dict[str, Dict[str, int]] = defaultdict(dict)
+    for r in rows:
+        jobs[r["target_table"]][r["status"]] = r["n"]
+
+    # Served from the partial "WHERE embedding IS NULL" indexes, not a heap scan
+    missing = {}
+    for table in SOURCE_COLUMNS:
+        missing[table] = await fetchval(f"SELECT COUNT(*) FROM {table} WHERE embedding IS NULL")
+    return {"jobs": jobs, "missing_embeddings": missing}
+
+async def _claim(limit: int) -> List[Dict[str, Any]]:
+    """
+    Claim a batch of due jobs. SKIP LOCKED lets several workers (or processes) share the queue;
+    'running' jobs whose worker died are reclaimed after the visibility timeout.
+    """
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            rows = await conn.fetch(
+                """
+                SELECT id, target_table, target_id, attempts
+                FROM embedding_jobs
+                WHERE (status = 'pending' AND run_after <= NOW())
+                   OR (status = 'running' AND locked_at < NOW() - make_interval(secs => $2))
+                ORDER BY id
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+                """,
+                limit, float(settings.embedding_job_visibility_seconds)
+            )
+            if rows:
+                await conn.execute(
+                    """
+                    UPDATE embedding_jobs
+                    SET status = 'running', locked_at = NOW(), attempts = attempts + 1
+                    WHERE id = ANY($1::bigint[])
+                    """,
+                    [r["id"] for r in rows]
+                )
+    return [dict(r) for r in rows]
+
+async def _fail(jobs: List[Dict[str, Any]], error: Exception):
+    """Reschedule with exponential backoff, or park as failed after the last attempt."""
+    records = []
+    for job in jobs:
+        attempts = job["attempts"] + 1
+        delay = min(settings.embedding_job_backoff_seconds * (2 ** (attempts - 1)), 3600)
+        status = "failed" if attempts >= settings.embedding_job_max_attempts else "pending"
+        records.append((job["id"], status, float(delay), str(error)[:500]))
+    await executemany(
+        """
+        UPDATE embedding_jobs
+        SET status = $2, run_after = NOW() + make_interval(secs => $3), last_error = $4, locked_at = NULL
+        WHERE id = $1
+        """,
+        records
+    )
+
+async def _process(table: str, jobs: List[Dict[str, Any]]):
+    ids = [job["target_id"] for job in jobs]
+    rows = [dict(r) for r in await fetch(
+        f"SELECT {SOURCE_COLUMNS[table]} FROM {table} WHERE id = ANY($1::int[])", ids
+    )]
+    if rows:
+        await store_embeddings(table, rows)
+        if table == "rag_chunks":
+            await execute(
+                """
+                UPDATE rag_documents d SET processed = TRUE
+                WHERE d.id IN (SELECT DISTINCT document_id FROM rag_chunks WHERE id = ANY($1::int[]))
+                  AND NOT EXISTS (SELECT 1 FROM rag_chunks c WHERE c.document_id = d.id AND c.embedding IS NULL)
+                """,
+                ids
+            )
+    # Rows deleted since they were queued are simply dropped along with their job
+    # A job re-enqueued while we worked is back to 'pending' and must survive
+    await execute(
+        "DELETE FROM embedding_jobs WHERE id = ANY($1::bigint[]) AND status = 'running'",
+        [job["id"] for job in jobs]
+    )
+
+async def run_once(limit: int = None) -> int:
+    """Claim and process one batch. Returns the number of jobs handled."""
+    jobs = await _claim(limit or settings.embedding_batch_size)
+    by_table: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for job in jobs:
+        by_table[job["target_table"]].append(job)
+
+    for table, table_jobs in by_table.items():
+        try:
+            await _process(table, table_jobs)
+        except Exception as e:
+            print(f"⚠️ Embedding jobs for {table} failed: {e}")
+            await _fail(table_jobs, e)
+    return len(jobs)
+
+async def run_worker(stop: asyncio.Event):
+    """
+    Background loop: drain the queue in batches, sleep when it is empty.
+    """
+    while not stop.is_set():
+        try:
+            handled = await run_once()
+        except Exception as e:
+            print(f"⚠️ Embedding worker error: {e}")
+            handled = 0
+        if not handled:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.embedding_job_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,82 @@
+from typing import Optional
+from core.cache import LRUCache
+from core.config import get_settings
+from core.database import fetchval, execute
+
+settings = get_settings()
+
+# Tables whose `embedding` column is tagged with the model that produced it
+VERSIONED_TABLES = ("items", "products", "opportunities", "rag_chunks")
+
+# Short-lived view of the registry; a flip is picked up within the refresh interval
+_registry = LRUCache(maxsize=64, ttl=settings.embedding_model_refresh_seconds)
+_MISSING = ""
+
+async def ensure_embedding_model_tables():
+    """Automatically create the model registry / migration tables and tag columns."""
+    try:
+        await execute("""
+            CREATE TABLE IF NOT EXISTS embedding_models (
+                table_name TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                updated_at TIMESTAMPTZ DEFAULT NOW()
+            );
+            CREATE TABLE IF NOT EXISTS embedding_migrations (
+                table_name TEXT PRIMARY KEY,
+                target_model TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'running',
+                started_at TIMESTAMPTZ DEFAULT NOW(),
+                flipped_at TIMESTAMPTZ
+            );
+            CREATE TABLE IF NOT EXISTS embedding_migration_shards (
+                table_name TEXT NOT NULL,
+                shard INTEGER NOT NULL,
+                lo INTEGER NOT NULL,
+                hi INTEGER NOT NULL,
+                last_id INTEGER NOT NULL,
+                done BOOLEAN NOT NULL DEFAULT FALSE,
+                PRIMARY KEY (table_name, shard)
+            );
+        """)
+    except Exception as e:
+        print(f"Warning: Could not check/create embedding model tables: {e}")
+
+    for table in VERSIONED_TABLES:
+        try:
+            await execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS embedding_model TEXT")
+        except Exception as e:
+            print(f"Warning: Could not add embedding_model to {table}: {e}")
+
+async def active_model(table: Optional[str]) -> str:
+    """
+    EMBEDDING_MODEL_NAME-style model whose vectors `table` currently serves.
+    Falls back to the configured model for tables that were never re-embedded.
+    """
+    if not table:
+        return settings.embedding_model_name
+    key = ("active", table)
+    model = _registry.get(key)
+    if model is None:
+        try:
+            model = await fetchval("SELECT model FROM embedding_models WHERE table_name = $1", table) or _MISSING
+        except Exception:
+            model = _MISSING
+        _registry.set(key, model)
+    return model or settings.embedding_model_name
+
+async def migration_target(table: str) -> Optional[str]:
+    """Target model of a running re-embed for `table`; writes must dual-write to it."""
+    key = ("migration", table)
+    model = _registry.get(key)
+    if model is None:
+        try:
+            model = await fetchval(
+                "SELECT target_model FROM embedding_migrations WHERE table_name = $1 AND status = 'running'", table
+            ) or _MISSING
+        except Exception:
+            model = _MISSING
+        _registry.set(key, model)
+    return model or None
+
+def invalidate():
+    _registry.clear()
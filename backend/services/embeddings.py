@@ -1,13 +1,21 @@
 import asyncio
-import json
 import google.generativeai as genai
-from typing import List, Optional
+import numpy as np
+from typing import Dict, List, Optional, Tuple
 from core.config import get_settings
-from core.database import fetch, execute, fetchval
+from core.database import execute, fetchval
+from core.cache import LRUCache
+from core.executor import run_blocking
+from core.rate_limit import limited_call
+from core.singleflight import SingleFlight
+from services import (
+    embedding_cache, embedding_models, local_embeddings, ml_client, neighbors, product_families, product_index,
+    search_cache
+)
 
 # Optional import for OpenAI
 try:
-    from openai import AsyncOpenAI
+    import openai  # noqa: F401
     _HAS_OPENAI = True
 except ImportError:
     _HAS_OPENAI = False
@@ -17,126 +25,185 @@ settings = get_settings()
 if settings.google_api_key:
     genai.configure(api_key=settings.google_api_key)
 
-openai_client = None
-if _HAS_OPENAI and settings.openai_api_key:
-    openai_client = AsyncOpenAI(api_key=settings.openai_api_key)
+# Shares the chat client's pooled connections
+openai_client = ml_client.openai_client
 
-async def embed_text(text: str) -> List[float]:
+# Search queries are short-lived and user-typed; keep them out of the persistent cache
+_query_cache = LRUCache(maxsize=settings.query_cache_size, ttl=settings.query_cache_ttl_seconds)
+
+# Identical provider requests in flight at the same time share one round trip
+_inflight = SingleFlight("embeddings")
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    """L2-normalize so inner product, cosine and L2 rank the same (see vector_storage.METRICS)."""
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+async def _embedding_target(model_name: Optional[str] = None) -> Tuple[str, str]:
     """
-    Generate embeddings for a single string using the configured provider.
+    (provider, model) that will produce embeddings for `model_name` (default
+    EMBEDDING_MODEL_NAME). LLM_PROVIDER=local or a 'local/<model>' name selects
+    the on-CPU provider.
     """
-    text = text.replace("\n", " ") # Common cleanup
     provider = settings.llm_provider.lower()
-    model = settings.embedding_model_name
+    model = model_name or settings.embedding_model_name
+    if provider == "local" or model.startswith("local/"):
+        return "local", await local_embeddings.effective_model(model)
+    return provider, model
 
+async def warm_up():
+    """Resolve the embedding provider at startup (loads the local model, if any)."""
+    provider, model = await _embedding_target()
+    print(f"✅ Embeddings: {provider} / {model}")
+
+async def _provider_embed(
+    batch: List[str],
+    provider: str,
+    model: str,
+    task_type: str = "retrieval_document"
+) -> List[np.ndarray]:
+    """Single provider round trip for one batch of already-normalized texts."""
     if provider == "google":
-        try:
-            # Google's text-embedding-004
-            result = genai.embed_content(
-                model=model,
-                content=text,
-                task_type="retrieval_document", 
-                title=None
-            )
-            return result['embedding']
-        except Exception as e:
-            print(f"Google Embedding Error: {e}")
-            # Fallback mock (768 dim is standard for Gemini embeddings)
-            return [0.0] * 768
+        # Google's text-embedding-004 accepts a list of contents per call
+        result = await limited_call(
+            "google", model,
+            run_blocking, "google",
+            genai.embed_content,
+            model=model,
+            content=batch,
+            task_type=task_type,
+            title=None
+        )
+        return [np.asarray(v, dtype=np.float32) for v in result['embedding']]
 
     elif provider == "openai":
         if not _HAS_OPENAI:
             raise ImportError("OpenAI provider selected but 'openai' package is not installed.")
-        if not openai_client: 
+        if not openai_client:
             raise ValueError("OpenAI Key missing")
-            
-        resp = await openai_client.embeddings.create(input=[text], model=model)
-        return resp.data[0].embedding
-    
+
+        resp = await limited_call("openai", model, openai_client.embeddings.create, input=batch, model=model)
+        return [np.asarray(d.embedding, dtype=np.float32) for d in sorted(resp.data, key=lambda d: d.index)]
+
+    elif provider == "local":
+        return await local_embeddings.embed(batch, model, batch_size=len(batch))
+
     else:
-        # Mock
-        return [0.01] * 768
+        # Mock: deterministic hashing vectors so results still differ per text
+        return list(local_embeddings.hashing_embed(batch))
+
+async def embed_texts(
+    texts: List[str],
+    batch_size: Optional[int] = None,
+    table: Optional[str] = None,
+    model: Optional[str] = None
+) -> List[np.ndarray]:
+    """
+    Generate float32 embeddings for many strings, packing them into provider batch requests.
+    Texts already embedded by the same provider/model are served from the embedding cache.
+    Output order matches input order. Provider errors (after rate-limited retries) are
+    raised, never replaced by placeholder vectors, so a failed embedding is never stored.
+    Uses `model` if given, else the model currently serving `table`, else EMBEDDING_MODEL_NAME.
+    """
+    if not texts:
+        return []
+
+    texts = [embedding_cache.normalize_text(t) for t in texts]
+    provider, model = await _embedding_target(model or await embedding_models.active_model(table))
+    size = max(1, batch_size or settings.embedding_batch_size)
+
+    vectors = await embedding_cache.get_many(provider, model, texts)
+    missing = [t for t in dict.fromkeys(texts) if t not in vectors]
+
+    for start in range(0, len(missing), size):
+        batch = missing[start:start + size]
+        vectors.update(
+            await _inflight.do(("documents", provider, model, tuple(batch)), _embed_batch, batch, provider, model)
+        )
+
+    return [_unit(vectors[t]) for t in texts]
+
+async def _embed_batch(batch: List[str], provider: str, model: str) -> Dict[str, np.ndarray]:
+    fresh = dict(zip(batch, await _provider_embed(batch, provider, model)))
+    await embedding_cache.put_many(provider, model, fresh)
+    return fresh
+
+async def embed_text(text: str, table: Optional[str] = None) -> np.ndarray:
+    """
+    Generate embeddings for a single string using the configured provider.
+    """
+    return (await embed_texts([text], table=table))[0]
+
+async def embed_query(query: str, table: Optional[str] = None) -> np.ndarray:
+    """
+    Embed a search query, reusing recent embeddings of the same normalized text.
+    Pass the searched `table` so the query matches the model its vectors came from.
+    """
+    text = " ".join(query.lower().split())
+    provider, model = await _embedding_target(await embedding_models.active_model(table))
+    key = (provider, model, text)
+
+    vector = _query_cache.get(key)
+    if vector is not None:
+        return vector
+    return await _inflight.do(("query",) + key, _embed_query, key)
+
+async def _embed_query(key: Tuple[str, str, str]) -> np.ndarray:
+    provider, model, text = key
+    vector = _unit((await _provider_embed([text], provider, model, task_type="retrieval_query"))[0])
+    _query_cache.set(key, vector)
+    return vector
+
+def query_cache_stats():
+    return {**_query_cache.stats(), "single_flight": _inflight.stats()}
 
-async def get_cached_user_embedding(user_id: int) -> Optional[List[float]]:
+async def get_cached_user_embedding(user_id: int) -> Optional[np.ndarray]:
     """
     Retrieve the stored embedding for a user profile.
     """
-    row = await fetchval("SELECT embedding FROM users WHERE id = $1", user_id)
-    if row:
-        if isinstance(row, str):
-            try:
-                return json.loads(row)
-            except:
-                return None
-        return row
-    return None
+    # The pool's pgvector codec already decodes to a float32 array
+    return await fetchval("SELECT embedding FROM users WHERE id = $1", user_id)
 
 async def embed_and_store_user(user_id: int, text: str):
     """
     Generate embedding for user profile text and store it.
     """
-    vector = await embed_text(text)
-    if vector:
-        await execute("UPDATE users SET embedding = $1 WHERE id = $2", str(vector), user_id)
+    # Profiles are matched against items, so they must share the items model
+    vector = await embed_text(text, table="items")
+    await execute("UPDATE users SET embedding = $1 WHERE id = $2", vector, user_id)
     return vector
 
 async def embed_and_store_item(item_id: int, text: str):
     """
     Generate embedding for an item (course) and store it.
     """
-    vector = await embed_text(text)
-    if vector:
-        await execute("UPDATE items SET embedding = $1 WHERE id = $2", str(vector), item_id)
+    model = await embedding_models.active_model("items")
+    vector = (await embed_texts([text], model=model))[0]
+    await execute("UPDATE items SET embedding = $1, embedding_model = $2 WHERE id = $3", vector, model, item_id)
+    await neighbors.mark_changed("items", [item_id])
     return vector
 
 async def embed_and_store_product(product_id: int, text: str):
     """
     Generate embedding for a product (lighting fixture) and store it.
     """
-    vector = await embed_text(text)
-    if vector:
-        await execute("UPDATE products SET embedding = $1 WHERE id = $2", str(vector), product_id)
+    model = await embedding_models.active_model("products")
+    vector = (await embed_texts([text], model=model))[0]
+    await execute("UPDATE products SET embedding = $1, embedding_model = $2 WHERE id = $3", vector, model, product_id)
+    await product_index.refresh([product_id])
+    await product_families.assign([product_id])
+    await search_cache.bump("products")
+    await neighbors.mark_changed("products", [product_id])
     return vector
 
-async def embed_all_items_missing(limit: int = 50):
-    """
-    Batch process items (courses) that don't have embeddings yet.
-    """
-    rows = await fetch("SELECT id, title, description FROM items WHERE embedding IS NULL LIMIT $1", limit)
-    count = 0
-    for row in rows:
-        text = f"{row['title']} {row['description']}"
-        await embed_and_store_item(row['id'], text)
-        count += 1
-    return count
-
-async def embed_all_products_missing(limit: int = 200):
-    """
-    Batch process products (lighting) that don't have embeddings yet.
-    """
-    # We fetch relevant columns to build a rich semantic string
-    rows = await fetch(
-        """
-        SELECT id, description, fixture_type, wattage, cct, ip_rating 
-        FROM products 
-        WHERE embedding IS NULL 
-        LIMIT $1
-        """, 
-        limit
-    )
-    count = 0
-    for row in rows:
-        # Construct a descriptive string for semantic search
-        # E.g. "Outdoor Wall Grazer 75W 3000K IP67..."
-        text = (
-            f"{row.get('fixture_type', '')} "
-            f"{row.get('description', '')} "
-            f"{row.get('wattage', '')} "
-            f"{row.get('cct', '')} "
-            f"{row.get('ip_rating', '')}"
-        ).strip()
-        
-        await embed_and_store_product(row['id'], text)
-        count += 1
-        
-    return count
\ No newline at end of file
+def product_search_text(row) -> str:
+    # Construct a descriptive string for semantic search
+    # E.g. "Outdoor Wall Grazer 75W 3000K IP67..."
+    return (
+        f"{row.get('fixture_type', '')} "
+        f"{row.get('title', '')} "
+        f"{row.get('description', '')} "
+        f"{row.get('wattage', '')} "
+        f"{row.get('cct', '')} "
+        f"{row.get('ip_rating', '')}"
+    ).strip()
@@ -0,0 +1,60 @@
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+from core.config import get_settings
+from core.database import execute, fetchval
+
+settings = get_settings()
+
+# table -> text columns searched with ILIKE; GIN trigram indexes make '%q%' index-backed
+TRIGRAM_COLUMNS = {
+    "opportunities": ("client_name", "project_name"),
+}
+
+# Set by ensure_trigram_indexes; without pg_trgm the ILIKE legs still work, just unindexed
+_has_trgm = False
+
+async def ensure_trigram_indexes():
+    """Automatically enable pg_trgm and create the trigram indexes the text legs rely on."""
+    global _has_trgm
+    try:
+        await execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        _has_trgm = True
+        for table, columns in TRIGRAM_COLUMNS.items():
+            for column in columns:
+                await execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)"
+                )
+    except Exception as e:
+        print(f"Warning: Could not create trigram indexes: {e}")
+        _has_trgm = bool(await fetchval("SELECT COUNT(*) FROM pg_extension WHERE extname = 'pg_trgm'"))
+
+def text_rank_sql(columns: Sequence[str], query: str = "$1") -> str:
+    """
+    ORDER BY expression for a text leg: best trigram word similarity across `columns`,
+    or (without pg_trgm) how early the query appears in them.
+    """
+    if _has_trgm:
+        return "GREATEST(" + ", ".join(f"word_similarity({query}, {c})" for c in columns) + ") DESC"
+    return "LEAST(" + ", ".join(f"NULLIF(strpos(lower({c}), lower({query})), 0)" for c in columns) + ")"
+
+def rrf_merge(
+    legs: Sequence[Sequence[Hashable]],
+    weights: Optional[Sequence[float]] = None,
+    k: Optional[int] = None,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Reciprocal rank fusion: score(d) = sum_i w_i / (k + rank_i(d)), ranks 1-based.
+    Each leg is an ordered list of ids; ranks are comparable across legs whose raw
+    scores are not (cosine vs trigram vs ts_rank). Returns [{"id", "rrf_score", "ranks"}].
+    """
+    k = k or settings.hybrid_rrf_k
+    weights = weights or [1.0] * len(legs)
+    fused: Dict[Hashable, Dict[str, Any]] = {}
+    for leg_index, (leg, weight) in enumerate(zip(legs, weights)):
+        for rank, doc_id in enumerate(leg, start=1):
+            entry = fused.setdefault(doc_id, {"id": doc_id, "rrf_score": 0.0, "ranks": [None] * len(legs)})
+            if entry["ranks"][leg_index] is None:
+                entry["ranks"][leg_index] = rank
+                entry["rrf_score"] += weight / (k + rank)
+    ordered = sorted(fused.values(), key=lambda e: e["rrf_score"], reverse=True)
+    return ordered[:limit] if limit else ordered
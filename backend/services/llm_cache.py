@@ -0,0 +1,92 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+from core.cache import LRUCache
+from core.config import get_settings
+from core.database import fetchval, execute
+
+settings = get_settings()
+
+# Hot tier in front of the llm_cache table, expiring like the rows behind it
+_memory = LRUCache(maxsize=settings.llm_cache_size, ttl=settings.llm_cache_ttl_seconds)
+_sites: Dict[str, Dict[str, int]] = {}
+
+def enabled() -> bool:
+    return settings.llm_cache.lower() == "on"
+
+def cacheable(temperature: float) -> bool:
+    """Only deterministic (temperature 0) calls return the same text for the same input."""
+    return enabled() and temperature == 0
+
+def request_key(provider: str, model: str, system_prompt: str, prompt: str, max_tokens: int, temperature: float) -> str:
+    payload = json.dumps([provider, model, system_prompt, prompt, max_tokens, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+async def ensure_llm_cache_table():
+    """Automatically create the LLM response cache table if it doesn't exist."""
+    try:
+        await execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                request_hash TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                call_site TEXT,
+                response TEXT NOT NULL,
+                created_at TIMESTAMPTZ DEFAULT NOW()
+            );
+        """)
+    except Exception as e:
+        print(f"Warning: Could not check/create llm_cache table: {e}")
+
+def _count(call_site: str, outcome: str):
+    site = _sites.setdefault(call_site, {"memory_hits": 0, "db_hits": 0, "misses": 0})
+    site[outcome] += 1
+
+async def get(key: str, call_site: str) -> Optional[str]:
+    """Cached response for a request key: in-process LRU first, then Postgres (within LLM_CACHE_TTL_SECONDS)."""
+    response = _memory.get(key)
+    if response is not None:
+        _count(call_site, "memory_hits")
+        return response
+    try:
+        response = await fetchval(
+            """
+            SELECT response FROM llm_cache
+            WHERE request_hash = $1 AND created_at > NOW() - make_interval(secs => $2)
+            """,
+            key, settings.llm_cache_ttl_seconds
+        )
+    except Exception as e:
+        print(f"LLM cache lookup failed: {e}")
+        response = None
+    if response is not None:
+        _memory.set(key, response)
+        _count(call_site, "db_hits")
+        return response
+    _count(call_site, "misses")
+    return None
+
+async def put(key: str, provider: str, model: str, call_site: str, response: str):
+    """Store a fresh response in both tiers."""
+    if not response:
+        return
+    _memory.set(key, response)
+    try:
+        await execute(
+            """
+            INSERT INTO llm_cache (request_hash, provider, model, call_site, response)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (request_hash) DO UPDATE SET response = EXCLUDED.response, created_at = NOW()
+            """,
+            key, provider, model, call_site, response
+        )
+    except Exception as e:
+        print(f"LLM cache write failed: {e}")
+
+def stats() -> Dict[str, Any]:
+    sites = {}
+    for call_site, c in _sites.items():
+        total = c["memory_hits"] + c["db_hits"] + c["misses"]
+        hits = c["memory_hits"] + c["db_hits"]
+        sites[call_site] = {**c, "hit_ratio": round(hits / total, 4) if total else 0.0}
+    return {"enabled": enabled(), **_memory.stats(), "call_sites": sites}
@@ -0,0 +1,102 @@
+import re
+import threading
+import zlib
+import numpy as np
+from typing import List, Optional
+from core.executor import run_blocking
+
+# Optional import for on-CPU sentence embedding models
+try:
+    from sentence_transformers import SentenceTransformer
+    _HAS_SENTENCE_TRANSFORMERS = True
+except ImportError:
+    _HAS_SENTENCE_TRANSFORMERS = False
+
+# Must match the vector(768) columns
+EMBEDDING_DIM = 768
+DEFAULT_LOCAL_MODEL = "sentence-transformers/all-mpnet-base-v2"
+HASHING_MODEL = "hashing-768"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)?")
+
+_model = None
+_model_name: Optional[str] = None
+_load_lock = threading.Lock()
+
+def _local_model_name(embedding_model_name: str) -> str:
+    """'local/<hf-model>' -> '<hf-model>'; a bare 'local' uses the default model."""
+    name = embedding_model_name.split("/", 1)[1] if embedding_model_name.startswith("local/") else ""
+    return name or DEFAULT_LOCAL_MODEL
+
+def _load(name: str):
+    global _model, _model_name
+    with _load_lock:
+        if _model_name == name:
+            return _model
+        _model = None
+        if not _HAS_SENTENCE_TRANSFORMERS:
+            print("⚠️ sentence-transformers not installed; using hashing embeddings")
+        else:
+            try:
+                # Never reach for the network: air-gapped sites ship the model files
+                _model = SentenceTransformer(name, device="cpu", local_files_only=True)
+                print(f"✅ Loaded local embedding model {name}")
+            except Exception as e:
+                print(f"⚠️ Local embedding model {name} unavailable ({e}); using hashing embeddings")
+        _model_name = name
+        return _model
+
+async def effective_model(embedding_model_name: str) -> str:
+    """
+    Name of what will actually produce the vectors, so the embedding cache never
+    mixes hashing-fallback vectors with real model vectors.
+    """
+    name = _local_model_name(embedding_model_name)
+    model = _model if _model_name == name else await run_blocking("local", _load, name)
+    return name if model is not None else HASHING_MODEL
+
+def _fit_dim(vectors: np.ndarray) -> np.ndarray:
+    """Zero-pad (or truncate) to EMBEDDING_DIM and re-normalize; padding preserves cosine."""
+    dim = vectors.shape[1]
+    if dim < EMBEDDING_DIM:
+        vectors = np.pad(vectors, ((0, 0), (0, EMBEDDING_DIM - dim)))
+    elif dim > EMBEDDING_DIM:
+        vectors = vectors[:, :EMBEDDING_DIM]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+def hashing_embed(texts: List[str]) -> np.ndarray:
+    """
+    Dependency-free fallback: signed feature hashing of word unigrams, bigrams and
+    character trigrams into EMBEDDING_DIM buckets, L2-normalized. Deterministic across
+    processes, so stored and query vectors stay comparable.
+    """
+    out = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = _TOKEN_RE.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for w in words:
+            padded = f"#{w}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            out[row, h % EMBEDDING_DIM] += 1.0 if (h >> 31) & 1 else -1.0
+    return _fit_dim(out)
+
+def _encode(texts: List[str], batch_size: int) -> np.ndarray:
+    if _model is None:
+        return hashing_embed(texts)
+    vectors = _model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    return _fit_dim(np.asarray(vectors, dtype=np.float32))
+
+async def embed(texts: List[str], model_name: str, batch_size: int = 64) -> List[np.ndarray]:
+    """
+    Embed a batch on CPU in the provider executor (model inference is blocking).
+    `model_name` is a resolved name from effective_model().
+    """
+    if model_name == HASHING_MODEL:
+        return list(hashing_embed(texts))
+    if _model_name != model_name:
+        await run_blocking("local", _load, model_name)
+    vectors = await run_blocking("local", _encode, texts, batch_size)
+    return list(vectors)
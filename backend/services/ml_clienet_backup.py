@@ -5,8 +5,10 @@ import numpy as np
 
 try:
 	from ..core.config import get_settings
+	from .ml_client import http_client
 except ImportError:
 	from core.config import get_settings
+	from services.ml_client import http_client
 
 # OFFICIAL EURI API EXAMPLES (as comments)
 #
@@ -61,22 +63,22 @@ async def get_embedding(text: str) -> List[float]:
 		"input": text,
 		"model": settings.embedding_model_name,
 	}
-	async with httpx.AsyncClient(timeout=60.0) as client:
-		try:
-			resp = await client.post(url, headers=_headers(), json=payload)
-			resp.raise_for_status()
-		except httpx.HTTPStatusError as e:
-			print(f"❌ Embedding API Error: {e.response.status_code} - {e.response.text}")
-			# Fallback to deterministic embedding
-			seed = abs(hash(text)) % (2**32)
-			rng = np.random.default_rng(seed)
-			vec = rng.normal(0, 0.01, 768).astype(np.float32)
-			norm = np.linalg.norm(vec) + 1e-12
-			return (vec / norm).tolist()
-		data = resp.json()
-		# Expected shape: {"data":[{"embedding":[...]}], ...}
-		embedding = data.get("data", [{}])[0].get("embedding", [])
-		return [float(x) for x in embedding]
+	client = http_client("euri")
+	try:
+		resp = await client.post(url, headers=_headers(), json=payload, timeout=60.0)
+		resp.raise_for_status()
+	except httpx.HTTPStatusError as e:
+		print(f"❌ Embedding API Error: {e.response.status_code} - {e.response.text}")
+		# Fallback to deterministic embedding
+		seed = abs(hash(text)) % (2**32)
+		rng = np.random.default_rng(seed)
+		vec = rng.normal(0, 0.01, 768).astype(np.float32)
+		norm = np.linalg.norm(vec) + 1e-12
+		return (vec / norm).tolist()
+	data = resp.json()
+	# Expected shape: {"data":[{"embedding":[...]}], ...}
+	embedding = data.get("data", [{}])[0].get("embedding", [])
+	return [float(x) for x in embedding]
 
 
 async def chat_reasoning(prompt: str, system_prompt: Optional[str] = None, max_tokens: int = 512) -> str:
@@ -96,30 +98,30 @@ async def chat_reasoning(prompt: str, system_prompt: Optional[str] = None, max_t
 		"max_tokens": max_tokens,
 		"temperature": 0.3,
 	}
-	async with httpx.AsyncClient(timeout=120.0) as client:
-		try:
-			resp = await client.post(url, headers=_headers(), json=payload)
-			resp.raise_for_status()
-		except httpx.HTTPStatusError as e:
-			# Log request/response for debugging
-			print(f"❌ ML API Error: {e.response.status_code} - {e.response.text}")
-			print(f"📤 Request payload: {json.dumps(payload, indent=2)}")
-			# Fallback to simple echo
-			return prompt[:max_tokens]
-		data = resp.json()
-		choices = data.get("choices", [])
-		if not choices:
-			return ""
-		# Try to support both structured content and plain text
-		message = choices[0].get("message", {})
-		content = message.get("content", "")
-		if isinstance(content, list):
-			parts = []
-			for part in content:
-				if isinstance(part, dict) and part.get("type") == "text":
-					parts.append(part.get("text", ""))
-			return "\n".join(p for p in parts if p)
-		return str(content)
+	client = http_client("euri")
+	try:
+		resp = await client.post(url, headers=_headers(), json=payload, timeout=120.0)
+		resp.raise_for_status()
+	except httpx.HTTPStatusError as e:
+		# Log request/response for debugging
+		print(f"❌ ML API Error: {e.response.status_code} - {e.response.text}")
+		print(f"📤 Request payload: {json.dumps(payload, indent=2)}")
+		# Fallback to simple echo
+		return prompt[:max_tokens]
+	data = resp.json()
+	choices = data.get("choices", [])
+	if not choices:
+		return ""
+	# Try to support both structured content and plain text
+	message = choices[0].get("message", {})
+	content = message.get("content", "")
+	if isinstance(content, list):
+		parts = []
+		for part in content:
+			if isinstance(part, dict) and part.get("type") == "text":
+				parts.append(part.get("text", ""))
+		return "\n".join(p for p in parts if p)
+	return str(content)
 
 
 async def rerank_with_llm(query: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -1,8 +1,16 @@
 import os
+import sys
 import json
+import re
+import httpx
 import google.generativeai as genai
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
+from core.cache import LRUCache
 from core.config import get_settings
+from core.executor import run_blocking
+from core.rate_limit import limited_call
+from core.singleflight import SingleFlight
+from services import llm_cache
 
 # Optional import for OpenAI
 try:
@@ -17,33 +25,152 @@ settings = get_settings()
 if settings.google_api_key:
     genai.configure(api_key=settings.google_api_key)
 
+# Client registry: one keep-alive HTTP pool per provider, reused model handles
+_http_clients: Dict[str, httpx.AsyncClient] = {}
+_http_requests: Dict[str, int] = {}
+_http_connects: Dict[str, int] = {}
+_gemini_models = LRUCache(maxsize=settings.llm_model_cache_size)
+
+def http_client(provider: str) -> httpx.AsyncClient:
+    """Shared pooled client for `provider`; connections (and TLS sessions) are reused across calls."""
+    client = _http_clients.get(provider)
+    if client is None or client.is_closed:
+        async def count_connect(event_name: str, info: Dict[str, Any]):
+            if event_name == "connection.connect_tcp.complete":
+                _http_connects[provider] = _http_connects.get(provider, 0) + 1
+
+        async def count_request(request: httpx.Request):
+            _http_requests[provider] = _http_requests.get(provider, 0) + 1
+            # httpx's documented "trace" request extension reports new TCP connections
+            request.extensions["trace"] = count_connect
+
+        client = httpx.AsyncClient(
+            timeout=settings.llm_http_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=settings.llm_http_max_connections,
+                max_keepalive_connections=settings.llm_http_max_keepalive,
+                keepalive_expiry=settings.llm_http_keepalive_seconds,
+            ),
+            event_hooks={"request": [count_request]},
+        )
+        _http_clients[provider] = client
+    return client
+
+def gemini_model(
+    model: str,
+    system_instruction: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None
+) -> "genai.GenerativeModel":
+    """GenerativeModel handle for (model, system instruction, generation config), built once."""
+    key = (model, system_instruction, temperature, max_tokens)
+    handle = _gemini_models.get(key)
+    if handle is None:
+        config = None
+        if temperature is not None or max_tokens is not None:
+            config = genai.GenerationConfig(temperature=temperature, max_output_tokens=max_tokens)
+        handle = genai.GenerativeModel(
+            model_name=model, system_instruction=system_instruction, generation_config=config
+        )
+        _gemini_models.set(key, handle)
+    return handle
+
 openai_client = None
 if _HAS_OPENAI and settings.openai_api_key:
-    openai_client = AsyncOpenAI(api_key=settings.openai_api_key)
+    openai_client = AsyncOpenAI(api_key=settings.openai_api_key, http_client=http_client("openai"))
+
+async def warm_up_clients():
+    """
+    Open the configured provider's connection at startup so the first
+    recommend/RFP request doesn't pay for DNS, TCP and TLS.
+    """
+    provider = settings.llm_provider.lower()
+    model = settings.llm_model_name
+    try:
+        if provider == "google" and settings.google_api_key:
+            gemini_model(model)
+            name = model if model.startswith("models/") else f"models/{model}"
+            await run_blocking("google", genai.get_model, name)
+        elif openai_client is not None and (provider == "openai" or "gpt" in model):
+            await openai_client.models.retrieve(model)
+        else:
+            return
+        print(f"✅ LLM client warmed up: {provider}/{model}")
+    except Exception as e:
+        print(f"⚠️ LLM client warm-up failed (first call will connect): {e}")
+
+def client_stats() -> Dict[str, Any]:
+    return {
+        "chat_single_flight": _inflight.stats(),
+        "gemini_models": _gemini_models.stats(),
+        "http_pools": {
+            provider: {
+                "requests": _http_requests.get(provider, 0),
+                "connections_opened": _http_connects.get(provider, 0),
+                "reused": _http_requests.get(provider, 0) - _http_connects.get(provider, 0),
+                "closed": client.is_closed,
+            }
+            for provider, client in _http_clients.items()
+        },
+    }
+
+async def close_clients():
+    for client in _http_clients.values():
+        await client.aclose()
+    _http_clients.clear()
+
+# Identical deterministic requests in flight at the same time share one provider call
+_inflight = SingleFlight("chat_reasoning")
 
 async def chat_reasoning(
     prompt: str, 
     system_prompt: str = "You are a helpful assistant.", 
     max_tokens: int = 1024,
-    temperature: float = 0.0
+    temperature: float = 0.0,
+    cache: bool = True,
+    call_site: Optional[str] = None
 ) -> str:
     """
     Unified chat function supporting both Google Gemini and OpenAI.
+    Deterministic calls (temperature 0) are answered from the LLM response cache
+    when the exact request was seen before, and concurrent identical ones share a
+    single provider call; pass cache=False to always call the model.
+    `call_site` labels the hit-rate counters (defaults to the calling module.function).
     """
     provider = settings.llm_provider.lower()
     model = settings.llm_model_name
 
+    if not cache or temperature != 0:
+        return await _chat(provider, model, prompt, system_prompt, max_tokens, temperature)
+
+    if call_site is None:
+        caller = sys._getframe(1)
+        call_site = f"{caller.f_globals.get('__name__', '?')}.{caller.f_code.co_name}"
+    key = llm_cache.request_key(provider, model, system_prompt, prompt, max_tokens, temperature)
+    return await _inflight.do(
+        key, _cached_chat, key, call_site, provider, model, prompt, system_prompt, max_tokens, temperature
+    )
+
+async def _cached_chat(
+    key: str, call_site: str, provider: str, model: str,
+    prompt: str, system_prompt: str, max_tokens: int, temperature: float
+) -> str:
+    if not llm_cache.cacheable(temperature):
+        return await _chat(provider, model, prompt, system_prompt, max_tokens, temperature)
+    cached = await llm_cache.get(key, call_site)
+    if cached is not None:
+        return cached
+    response = await _chat(provider, model, prompt, system_prompt, max_tokens, temperature)
+    await llm_cache.put(key, provider, model, call_site, response)
+    return response
+
+async def _chat(
+    provider: str, model: str, prompt: str, system_prompt: str, max_tokens: int, temperature: float
+) -> str:
     if provider == "google":
         try:
-            gemini_model = genai.GenerativeModel(
-                model_name=model,
-                system_instruction=system_prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=temperature,
-                    max_output_tokens=max_tokens
-                )
-            )
-            response = await gemini_model.generate_content_async(prompt)
+            handle = gemini_model(model, system_prompt, temperature, max_tokens)
+            response = await limited_call("google", model, handle.generate_content_async, prompt)
             return response.text
         except Exception as e:
             print(f"Gemini Error: {e}")
@@ -56,7 +183,9 @@ async def chat_reasoning(
             raise ValueError("OpenAI API Key not found")
             
         try:
-            response = await openai_client.chat.completions.create(
+            response = await limited_call(
+                "openai", model,
+                openai_client.chat.completions.create,
                 model=model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -73,6 +202,92 @@ async def chat_reasoning(
     else:
         return f"Mock response from {model}: {prompt[:50]}..."
 
+async def chat_reasoning_stream(
+    prompt: str,
+    system_prompt: str = "You are a helpful assistant.",
+    max_tokens: int = 1024,
+    temperature: float = 0.0,
+    cache: bool = True,
+    call_site: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of chat_reasoning: yields text chunks as the provider produces them.
+    A cached deterministic answer is yielded as a single chunk; a fresh one is written
+    to the LLM response cache only once the stream has completed.
+    """
+    provider = settings.llm_provider.lower()
+    model = settings.llm_model_name
+
+    key = None
+    if cache and llm_cache.cacheable(temperature):
+        if call_site is None:
+            caller = sys._getframe(1)
+            call_site = f"{caller.f_globals.get('__name__', '?')}.{caller.f_code.co_name}"
+        key = llm_cache.request_key(provider, model, system_prompt, prompt, max_tokens, temperature)
+        cached = await llm_cache.get(key, call_site)
+        if cached is not None:
+            yield cached
+            return
+
+    parts: List[str] = []
+    async for text in _chat_stream(provider, model, prompt, system_prompt, max_tokens, temperature):
+        parts.append(text)
+        yield text
+
+    if key is not None:
+        await llm_cache.put(key, provider, model, call_site, "".join(parts))
+
+async def _chat_stream(
+    provider: str, model: str, prompt: str, system_prompt: str, max_tokens: int, temperature: float
+) -> AsyncIterator[str]:
+    if provider == "google":
+        try:
+            handle = gemini_model(model, system_prompt, temperature, max_tokens)
+            response = await limited_call("google", model, handle.generate_content_async, prompt, stream=True)
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. the final safety/finish metadata)
+                    continue
+                if text:
+                    yield text
+        except Exception as e:
+            print(f"Gemini Stream Error: {e}")
+            raise e
+
+    elif provider == "openai" or "gpt" in model:
+        if not _HAS_OPENAI:
+            raise ImportError("OpenAI provider selected but 'openai' package is not installed.")
+        if not openai_client:
+            raise ValueError("OpenAI API Key not found")
+
+        try:
+            stream = await limited_call(
+                "openai", model,
+                openai_client.chat.completions.create,
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            print(f"OpenAI Stream Error: {e}")
+            raise e
+
+    else:
+        # Same text as the non-streaming mock, split into word-sized chunks
+        text = f"Mock response from {model}: {prompt[:50]}..."
+        for word in re.findall(r"\s*\S+|\s+$", text):
+            yield word
+
 async def rerank_with_llm(query: str, items: List[Dict[str, Any]], top_k: int = 5) -> List[Dict[str, Any]]:
     """
     Reranks a list of items based on the user query using the configured LLM.
@@ -0,0 +1,228 @@
+import asyncio
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from core.config import get_settings
+from core.database import get_db_pool, fetch, fetchval, execute
+from core.executor import run_index
+
+settings = get_settings()
+
+# Tables with precomputed neighbour lists -> columns returned with each neighbour
+COLUMNS = {
+    "items": "id, title, description, category, tags, difficulty",
+    "products": "id, title, description, price, wattage, cct, ip_rating, image_url",
+}
+
+# Only one process recomputes at a time
+_BUILD_LOCK = 7_340_022
+
+async def ensure_neighbor_tables():
+    """Automatically create the neighbour lists and their change queue."""
+    try:
+        await execute("""
+            CREATE TABLE IF NOT EXISTS embedding_neighbors (
+                source_table TEXT NOT NULL,
+                source_id INTEGER NOT NULL,
+                rank SMALLINT NOT NULL,
+                neighbor_id INTEGER NOT NULL,
+                similarity REAL NOT NULL,
+                PRIMARY KEY (source_table, source_id, rank)
+            );
+            CREATE TABLE IF NOT EXISTS embedding_neighbor_updates (
+                source_table TEXT NOT NULL,
+                source_id INTEGER NOT NULL,
+                queued_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (source_table, source_id)
+            );
+        """)
+    except Exception as e:
+        print(f"Warning: Could not check/create embedding_neighbors tables: {e}")
+
+async def mark_changed(table: str, ids: Iterable[int]):
+    """Queue rows whose embedding changed; the builder recomputes the neighbourhoods they touch."""
+    if table not in COLUMNS:
+        return
+    ids = list(ids)
+    if not ids:
+        return
+    await execute(
+        """
+        INSERT INTO embedding_neighbor_updates (source_table, source_id)
+        SELECT $1, unnest($2::int[])
+        ON CONFLICT (source_table, source_id) DO UPDATE SET queued_at = NOW()
+        """,
+        table, ids
+    )
+
+async def invalidate(table: str):
+    """Drop every list for `table` (e.g. after a model flip); the builder recomputes them all."""
+    if table in COLUMNS:
+        await execute("DELETE FROM embedding_neighbors WHERE source_table = $1", table)
+
+def _top_k(
+    queries: np.ndarray, query_ids: np.ndarray, matrix: np.ndarray, ids: np.ndarray, k: int, batch: int
+) -> List[Tuple[int, List[Tuple[int, float]]]]:
+    """Exact top-k by inner product for each query row, excluding the row itself."""
+    position = {int(i): p for p, i in enumerate(ids.tolist())}
+    k = min(k, len(ids) - 1)
+    results = []
+    if k <= 0:
+        return [(int(q), []) for q in query_ids.tolist()]
+    for start in range(0, len(queries), batch):
+        block = queries[start:start + batch] @ matrix.T
+        block_ids = query_ids[start:start + batch].tolist()
+        for r, qid in enumerate(block_ids):
+            if qid in position:
+                block[r, position[qid]] = -np.inf
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        for r, qid in enumerate(block_ids):
+            results.append((qid, list(zip(ids[top[r]].tolist(), scores[r].tolist()))))
+    return results
+
+def _affected(
+    matrix: np.ndarray, ids: np.ndarray, changed: Set[int], lists: Dict[int, Dict[str, Any]], k: int
+) -> np.ndarray:
+    """
+    Rows whose stored list can differ after `changed` moved: the changed rows themselves,
+    rows that listed one of them, rows a changed vector now beats their k-th neighbour in,
+    and rows with no (or a short) list yet.
+    """
+    full = min(k, len(ids) - 1)
+    affected = np.zeros(len(ids), dtype=bool)
+    floors = np.full(len(ids), np.inf, dtype=np.float32)
+    for p, i in enumerate(ids.tolist()):
+        entry = lists.get(i)
+        if i in changed or entry is None or entry["count"] < full or changed.intersection(entry["neighbor_ids"]):
+            affected[p] = True
+        else:
+            floors[p] = entry["floor"]
+    moved = np.isin(ids, np.fromiter(changed, dtype=np.int64, count=len(changed)))
+    if moved.any():
+        best = (matrix @ matrix[moved].T).max(axis=1)
+        affected |= best > floors
+    return affected
+
+def _compute(table_ids: np.ndarray, vectors: np.ndarray, changed: Set[int], lists, k: int, batch: int):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    matrix = vectors / np.where(norms == 0, 1, norms)
+    affected = _affected(matrix, table_ids, changed, lists, k)
+    return _top_k(matrix[affected], table_ids[affected], matrix, table_ids, k, batch)
+
+async def recompute(table: str, changed: Iterable[int] = ()) -> int:
+    """
+    Bring `table`'s neighbour lists up to date after `changed` rows moved
+    (with nothing stored yet this is a full build). Returns the number of lists rewritten.
+    """
+    k = settings.neighbors_k
+    changed = set(changed)
+    records = await fetch(f"SELECT id, embedding FROM {table} WHERE embedding IS NOT NULL ORDER BY id")
+    ids = np.fromiter((r["id"] for r in records), dtype=np.int64, count=len(records))
+    vectors = (
+        np.stack([np.asarray(r["embedding"], dtype=np.float32) for r in records])
+        if records else np.zeros((0, 0), dtype=np.float32)
+    )
+    lists = {
+        r["source_id"]: {"floor": r["floor"], "count": r["count"], "neighbor_ids": r["neighbor_ids"]}
+        for r in await fetch(
+            """
+            SELECT source_id, MIN(similarity) AS floor, COUNT(*) AS count, array_agg(neighbor_id) AS neighbor_ids
+            FROM embedding_neighbors WHERE source_table = $1 GROUP BY source_id
+            """,
+            table
+        )
+    }
+    present = set(ids.tolist())
+    removed = [i for i in lists if i not in present]
+    updated = (
+        await run_index(_compute, ids, vectors, changed, lists, k, settings.neighbors_batch_size)
+        if records else []
+    )
+
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                "DELETE FROM embedding_neighbors WHERE source_table = $1 AND source_id = ANY($2::int[])",
+                table, [source for source, _ in updated] + removed
+            )
+            await conn.executemany(
+                """
+                INSERT INTO embedding_neighbors (source_table, source_id, rank, neighbor_id, similarity)
+                VALUES ($1, $2, $3, $4, $5)
+                """,
+                [
+                    (table, source, rank, neighbor, score)
+                    for source, neighbors in updated
+                    for rank, (neighbor, score) in enumerate(neighbors, start=1)
+                ]
+            )
+    return len(updated)
+
+async def _process(table: str) -> int:
+    pending = await fetch(
+        "SELECT source_id, queued_at FROM embedding_neighbor_updates WHERE source_table = $1", table
+    )
+    missing = await fetchval(
+        f"""
+        SELECT EXISTS (
+            SELECT 1 FROM {table} t
+            WHERE t.embedding IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM embedding_neighbors n
+                WHERE n.source_table = $1 AND n.source_id = t.id AND n.rank = 1
+            )
+        )
+        """,
+        table
+    )
+    if not pending and not missing:
+        return 0
+    rewritten = await recompute(table, [r["source_id"] for r in pending])
+    # Rows re-queued while we computed keep their newer queued_at and run next cycle
+    await execute(
+        """
+        DELETE FROM embedding_neighbor_updates u
+        USING unnest($2::int[], $3::timestamptz[]) AS done(source_id, queued_at)
+        WHERE u.source_table = $1 AND u.source_id = done.source_id AND u.queued_at = done.queued_at
+        """,
+        table, [r["source_id"] for r in pending], [r["queued_at"] for r in pending]
+    )
+    return rewritten
+
+async def run_builder(stop: asyncio.Event):
+    """Background loop: recompute the neighbourhoods touched by embedding changes."""
+    while not stop.is_set():
+        try:
+            pool = await get_db_pool()
+            async with pool.acquire() as conn:
+                if await conn.fetchval("SELECT pg_try_advisory_lock($1)", _BUILD_LOCK):
+                    try:
+                        for table in COLUMNS:
+                            rewritten = await _process(table)
+                            if rewritten:
+                                print(f"✅ Recomputed {rewritten} neighbour lists for {table}")
+                    finally:
+                        await conn.execute("SELECT pg_advisory_unlock($1)", _BUILD_LOCK)
+        except Exception as e:
+            print(f"⚠️ Neighbour list update failed: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.neighbors_refresh_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+async def similar(table: str, source_id: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Stored nearest neighbours of one row: a single primary-key range read."""
+    rows = await fetch(
+        f"""
+        SELECT {", ".join(f"t.{c.strip()}" for c in COLUMNS[table].split(","))}, n.similarity
+        FROM embedding_neighbors n
+        JOIN {table} t ON t.id = n.neighbor_id
+        WHERE n.source_table = $1 AND n.source_id = $2 AND n.rank <= $3
+        ORDER BY n.rank
+        """,
+        table, source_id, limit or settings.neighbors_k
+    )
+    return [{**dict(r), "score": float(r["similarity"])} for r in rows]
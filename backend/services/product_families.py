@@ -0,0 +1,212 @@
+import numpy as np
+from typing import Any, Dict, Iterable, List, Tuple
+from core.config import get_settings
+from core.database import get_db_pool, fetch, fetchval, execute
+from core.executor import run_index
+from services import vector_storage
+
+settings = get_settings()
+
+# Set once families exist (startup refresh or rebuild); searches stay flat until then
+_built = False
+
+async def ensure_product_family_tables():
+    """Automatically create product_families and the products.family_id link."""
+    try:
+        await execute("""
+            CREATE TABLE IF NOT EXISTS product_families (
+                id SERIAL PRIMARY KEY,
+                fixture_key TEXT NOT NULL,
+                watts NUMERIC,
+                centroid vector(768) NOT NULL,
+                size INTEGER NOT NULL,
+                built_at TIMESTAMPTZ DEFAULT NOW()
+            );
+            ALTER TABLE products ADD COLUMN IF NOT EXISTS family_id INTEGER;
+            CREATE INDEX IF NOT EXISTS idx_products_family_id ON products (family_id);
+        """)
+    except Exception as e:
+        print(f"Warning: Could not check/create product_families table: {e}")
+
+def enabled() -> bool:
+    return settings.product_families.lower() == "on" and _built
+
+async def refresh():
+    global _built
+    _built = bool(await fetchval("SELECT EXISTS (SELECT 1 FROM product_families)"))
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+def _cluster(records: List[Dict[str, Any]], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Leader clustering inside each (fixture type, wattage) group: a product joins the
+    closest family whose centroid is at least `threshold` cosine-similar, else starts one.
+    Variants differing only in housing colour, connector or driver land together.
+    """
+    groups: Dict[Tuple[str, Any], List[Dict[str, Any]]] = {}
+    for r in records:
+        groups.setdefault((r["fixture_key"], r["watts"]), []).append(r)
+
+    families = []
+    for (fixture_key, watts), members in groups.items():
+        sums: List[np.ndarray] = []
+        centroids: List[np.ndarray] = []
+        product_ids: List[List[int]] = []
+        for r in members:
+            v = _unit(np.asarray(r["embedding"], dtype=np.float32))
+            if centroids:
+                scores = np.stack(centroids) @ v
+                best = int(np.argmax(scores))
+                if scores[best] >= threshold:
+                    sums[best] += v
+                    centroids[best] = _unit(sums[best])
+                    product_ids[best].append(r["id"])
+                    continue
+            sums.append(v.copy())
+            centroids.append(v)
+            product_ids.append([r["id"]])
+        for centroid, ids in zip(centroids, product_ids):
+            families.append({"fixture_key": fixture_key, "watts": watts, "centroid": centroid, "product_ids": ids})
+    return families
+
+_KEY_SQL = "lower(btrim(coalesce(fixture_type, '')))"
+
+async def rebuild() -> Dict[str, int]:
+    """Recluster the whole catalog and relink every product to its family."""
+    global _built
+    records = [
+        dict(r) for r in await fetch(
+            f"SELECT id, {_KEY_SQL} AS fixture_key, watts, embedding FROM products WHERE embedding IS NOT NULL ORDER BY id"
+        )
+    ]
+    families = await run_index(_cluster, records, settings.product_family_similarity)
+
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("UPDATE products SET family_id = NULL WHERE family_id IS NOT NULL")
+            await conn.execute("TRUNCATE product_families RESTART IDENTITY")
+            for family in families:
+                family_id = await conn.fetchval(
+                    "INSERT INTO product_families (fixture_key, watts, centroid, size) VALUES ($1, $2, $3, $4) RETURNING id",
+                    family["fixture_key"], family["watts"], family["centroid"], len(family["product_ids"])
+                )
+                await conn.execute(
+                    "UPDATE products SET family_id = $1 WHERE id = ANY($2::int[])", family_id, family["product_ids"]
+                )
+    _built = bool(families)
+    return {"products": len(records), "families": len(families)}
+
+async def _recenter(conn, family_ids: Iterable[int]):
+    """Recompute size and centroid of the given families from their current members; drop empty ones."""
+    family_ids = [i for i in set(family_ids) if i is not None]
+    if not family_ids:
+        return
+    members: Dict[int, List[np.ndarray]] = {i: [] for i in family_ids}
+    for r in await conn.fetch(
+        "SELECT family_id, embedding FROM products WHERE family_id = ANY($1::int[]) AND embedding IS NOT NULL",
+        family_ids
+    ):
+        members[r["family_id"]].append(_unit(np.asarray(r["embedding"], dtype=np.float32)))
+    empty = [i for i, vectors in members.items() if not vectors]
+    if empty:
+        await conn.execute("DELETE FROM product_families WHERE id = ANY($1::int[])", empty)
+    for family_id, vectors in members.items():
+        if vectors:
+            await conn.execute(
+                "UPDATE product_families SET centroid = $2, size = $3 WHERE id = $1",
+                family_id, _unit(np.sum(vectors, axis=0)), len(vectors)
+            )
+
+async def assign(product_ids: Iterable[int]):
+    """
+    Place re-embedded products into the closest matching family (or a new one)
+    without reclustering; `vector_admin.py families` rebuilds from scratch.
+    Checks the table rather than this process's flag, so writers that started
+    before the first build (e.g. the job worker) still link new products.
+    """
+    await refresh()
+    if not _built:
+        return
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            rows = await conn.fetch(
+                f"""
+                SELECT id, family_id, {_KEY_SQL} AS fixture_key, watts, embedding
+                FROM products WHERE id = ANY($1::int[]) AND embedding IS NOT NULL
+                """,
+                list(product_ids)
+            )
+            touched = set()
+            for r in rows:
+                vector = _unit(np.asarray(r["embedding"], dtype=np.float32))
+                # Centroids are unit vectors, so negative inner product orders by cosine
+                family = await conn.fetchrow(
+                    """
+                    SELECT id, -(centroid <#> $1) AS similarity FROM product_families
+                    WHERE fixture_key = $2 AND watts IS NOT DISTINCT FROM $3
+                    ORDER BY centroid <#> $1 LIMIT 1
+                    """,
+                    vector, r["fixture_key"], r["watts"]
+                )
+                if family and family["similarity"] >= settings.product_family_similarity:
+                    family_id = family["id"]
+                else:
+                    family_id = await conn.fetchval(
+                        "INSERT INTO product_families (fixture_key, watts, centroid, size) VALUES ($1, $2, $3, 1) RETURNING id",
+                        r["fixture_key"], r["watts"], vector
+                    )
+                if family_id != r["family_id"]:
+                    await conn.execute("UPDATE products SET family_id = $1 WHERE id = $2", family_id, r["id"])
+                # The member's vector changed either way; the family it left loses it
+                touched.update((family_id, r["family_id"]))
+            await _recenter(conn, touched)
+
+def family_sql(columns: str, where: str, vector: str, limit: str, families: int, prefer: str = "") -> str:
+    """
+    Two-stage top-k: rank family centroids (one row per family, so the scan is
+    catalog size / family size), then pick the best variant inside each of the top
+    `families` families that have a variant passing `where` - `prefer` (exact
+    attribute matches) first, then distance.
+    One result per family keeps near-identical variants from filling the list.
+    Products without a family compete alongside, so none is unreachable.
+    """
+    filters = f" AND {where}" if where else ""
+    # Rank only families with a member meeting the constraints, so a constrained line
+    # is not left short by top families whose variants are all filtered out
+    eligible = (
+        f"WHERE EXISTS (SELECT 1 FROM products WHERE family_id = pf.id AND embedding IS NOT NULL{filters})"
+        if where else ""
+    )
+    similarity = vector_storage.similarity_sql("products", vector=vector)
+    distance = vector_storage.distance_sql("products", vector=vector)
+    # Products not linked to a family yet (written before any build) are ranked directly
+    return f"""
+        SELECT * FROM (
+            (
+                SELECT DISTINCT ON (family_id) {columns}, family_id, {similarity} AS similarity
+                FROM (
+                    SELECT id AS family_id FROM product_families pf
+                    {eligible}
+                    ORDER BY centroid <#> {vector}
+                    LIMIT {int(families)}
+                ) f
+                JOIN products USING (family_id)
+                WHERE embedding IS NOT NULL{filters}
+                ORDER BY family_id, {prefer}{distance}
+            )
+            UNION ALL
+            (
+                SELECT {columns}, family_id, {similarity} AS similarity
+                FROM products
+                WHERE family_id IS NULL AND embedding IS NOT NULL{filters}
+                ORDER BY {distance}
+                LIMIT {limit}
+            )
+        ) variants
+        ORDER BY similarity DESC
+        LIMIT {limit}
+    """
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional
+from core.config import get_settings
+from core.database import fetch
+from core.executor import run_index
+from services import embedding_models
+from services.local_embeddings import EMBEDDING_DIM
+
+# Optional import for the in-process HNSW graph
+try:
+    import hnswlib
+    _HAS_HNSWLIB = True
+except ImportError:
+    _HAS_HNSWLIB = False
+
+settings = get_settings()
+
+# Same columns search_similar_products returns from Postgres
+_COLUMNS = "id, title, description, price, wattage, cct, ip_rating"
+
+_lock = threading.Lock()
+_index = None                      # hnswlib.Index, or None for the numpy fallback
+_rows: Dict[int, Dict[str, Any]] = {}
+_vectors: Dict[int, np.ndarray] = {}
+_deleted: set = set()              # labels still present in the graph but marked deleted
+_matrix: Optional[np.ndarray] = None   # numpy fallback, rebuilt lazily after writes
+_matrix_ids: Optional[np.ndarray] = None
+_ready = False
+_model: Optional[str] = None       # embedding model the loaded vectors came from
+_reload: Optional[asyncio.Task] = None
+
+def enabled() -> bool:
+    return settings.product_index.lower() == "memory"
+
+def ready() -> bool:
+    return _ready
+
+def _new_index(capacity: int):
+    index = hnswlib.Index(space="ip", dim=EMBEDDING_DIM)
+    index.init_index(max_elements=max(capacity, 1024), ef_construction=200, M=16)
+    index.set_ef(settings.product_index_ef_search)
+    return index
+
+def _build(records: List[Dict[str, Any]], model: str):
+    global _index, _rows, _vectors, _deleted, _matrix, _matrix_ids, _ready, _model
+    vectors = {r["id"]: np.asarray(r.pop("embedding"), dtype=np.float32) for r in records}
+    rows = {r["id"]: r for r in records}
+    index = None
+    if _HAS_HNSWLIB:
+        index = _new_index(len(vectors) * 2)
+        if vectors:
+            index.add_items(np.stack(list(vectors.values())), np.fromiter(vectors.keys(), dtype=np.int64))
+    with _lock:
+        _index, _rows, _vectors, _deleted = index, rows, vectors, set()
+        _matrix = _matrix_ids = None
+        _model = model
+        _ready = True
+
+async def load():
+    """(Re)build the index from products.embedding; Postgres stays the source of truth."""
+    model = await embedding_models.active_model("products")
+    records = [
+        dict(r) for r in await fetch(f"SELECT {_COLUMNS}, embedding FROM products WHERE embedding IS NOT NULL")
+    ]
+    await run_index(_build, records, model)
+    backend = "hnswlib" if _HAS_HNSWLIB else "numpy (hnswlib not installed)"
+    print(f"✅ Product index loaded: {len(records)} products ({model}) via {backend}")
+
+async def _reload_now():
+    try:
+        await load()
+    except Exception as e:
+        print(f"⚠️ Product index reload failed: {e}")
+
+async def current() -> bool:
+    """
+    True when the index is loaded from the model queries are embedded with now.
+    After a re-embed flip it is bypassed (callers use Postgres) while a reload runs,
+    so query and product vectors never come from two different models.
+    """
+    global _reload
+    if not _ready:
+        return False
+    if await embedding_models.active_model("products") == _model:
+        return True
+    if _reload is None or _reload.done():
+        _reload = asyncio.create_task(_reload_now())
+    return False
+
+def _apply(records: List[Dict[str, Any]], removed: List[int]):
+    global _matrix, _matrix_ids
+    with _lock:
+        for product_id in removed:
+            _rows.pop(product_id, None)
+            if _vectors.pop(product_id, None) is not None and _index is not None:
+                _index.mark_deleted(product_id)
+                _deleted.add(product_id)
+        for r in records:
+            vector = np.asarray(r.pop("embedding"), dtype=np.float32)
+            if _index is not None:
+                if r["id"] in _deleted:
+                    # Re-adding a known label updates it in place once it is live again
+                    _index.unmark_deleted(r["id"])
+                    _deleted.discard(r["id"])
+                elif r["id"] not in _vectors and _index.get_current_count() >= _index.get_max_elements():
+                    _index.resize_index(_index.get_max_elements() * 2)
+                _index.add_items(vector[None, :], np.asarray([r["id"]], dtype=np.int64))
+            _rows[r["id"]] = r
+            _vectors[r["id"]] = vector
+        _matrix = _matrix_ids = None
+
+async def refresh(product_ids: Iterable[int]):
+    """Re-read the given products after a write so matching sees their current vector and fields."""
+    if not _ready:
+        return
+    ids = list(product_ids)
+    if not ids:
+        return
+    records = [
+        dict(r) for r in await fetch(
+            f"SELECT {_COLUMNS}, embedding FROM products WHERE id = ANY($1::int[]) AND embedding IS NOT NULL", ids
+        )
+    ]
+    found = {r["id"] for r in records}
+    _apply(records, [i for i in ids if i not in found])
+
+def search(embedding: np.ndarray, top_k: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Top-k products by inner product (= cosine on the stored unit vectors).
+    Returns None when the index is not loaded so callers fall back to Postgres.
+    """
+    global _matrix, _matrix_ids
+    if not _ready:
+        return None
+    query = np.asarray(embedding, dtype=np.float32)
+    with _lock:
+        k = min(top_k, len(_vectors))
+        if k <= 0:
+            return []
+        if _index is not None:
+            labels, distances = _index.knn_query(query[None, :], k=k)
+            hits = zip(labels[0].tolist(), (1.0 - distances[0]).tolist())
+        else:
+            if _matrix is None:
+                _matrix_ids = np.fromiter(_vectors.keys(), dtype=np.int64)
+                _matrix = np.stack(list(_vectors.values()))
+            scores = _matrix @ query
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            hits = zip(_matrix_ids[top].tolist(), scores[top].tolist())
+        return [{**_rows[i], "similarity": s, "score": s} for i, s in hits]
+
+async def run_refresher(stop: asyncio.Event):
+    """Periodic full reload picks up writes made by other processes (and model flips)."""
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.product_index_refresh_seconds)
+        except asyncio.TimeoutError:
+            try:
+                await load()
+            except Exception as e:
+                print(f"⚠️ Product index refresh failed: {e}")
+
+def stats() -> Dict[str, Any]:
+    return {
+        "enabled": enabled(),
+        "ready": _ready,
+        "backend": "hnswlib" if _index is not None else "numpy",
+        "model": _model,
+        "products": len(_vectors),
+    }
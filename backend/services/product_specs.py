@@ -0,0 +1,95 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from core.config import get_settings
+from core.database import execute
+
+settings = get_settings()
+
+# Numeric spec columns, generated by Postgres from the free-text columns so every
+# ingest path (API, seed SQL, bulk loads) fills them. Unparseable text stays NULL.
+SPEC_COLUMNS = {
+    "watts": r"NUMERIC GENERATED ALWAYS AS (substring(wattage FROM '(\d+(?:\.\d+)?)\s*[Ww]')::numeric) STORED",
+    "kelvin": r"INTEGER GENERATED ALWAYS AS (substring(cct FROM '(\d{4,5})\s*[Kk]')::integer) STORED",
+    "ip_code": r"INTEGER GENERATED ALWAYS AS (substring(ip_rating FROM '[Ii][Pp]\s*(\d{2})')::integer) STORED",
+    "beam_deg": r"NUMERIC GENERATED ALWAYS AS (substring(beam_angle FROM '(\d+(?:\.\d+)?)\s*(?:[Dd°º]|deg)')::numeric) STORED",
+}
+
+_WATTS_RE = re.compile(r"(\d+(?:\.\d+)?)\s*W", re.IGNORECASE)
+_KELVIN_RE = re.compile(r"(\d{4,5})\s*K", re.IGNORECASE)
+_IP_RE = re.compile(r"IP\s*(\d{2})", re.IGNORECASE)
+
+async def ensure_product_spec_columns():
+    """Automatically add the numeric spec columns and their B-tree indexes."""
+    for column, definition in SPEC_COLUMNS.items():
+        try:
+            await execute(f"ALTER TABLE products ADD COLUMN IF NOT EXISTS {column} {definition}")
+            await execute(f"CREATE INDEX IF NOT EXISTS idx_products_{column} ON products ({column})")
+        except Exception as e:
+            print(f"Warning: Could not add products.{column}: {e}")
+
+def _first(req: Dict[str, Any], *keys: str) -> str:
+    for key in keys:
+        value = req.get(key)
+        if value and value != "N/A":
+            return str(value)
+    return ""
+
+def requirement_constraints(req: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Hard constraints from a requirement line (after refine_with_regex):
+    watts (matched within SPEC_WATTAGE_TOLERANCE), exact kelvin, minimum IP code.
+    Beam angle is left to similarity: catalog beams are too irregular to filter on.
+    """
+    constraints: Dict[str, Any] = {}
+    m = _WATTS_RE.search(_first(req, "Wattage", "wattage"))
+    if m:
+        constraints["watts"] = float(m.group(1))
+    m = _KELVIN_RE.search(_first(req, "CCT", "Color_Temperature", "cct"))
+    if m:
+        constraints["kelvin"] = int(m.group(1))
+    m = _IP_RE.search(_first(req, "IP", "IP_Rating", "ip_rating"))
+    if m:
+        constraints["ip_code"] = int(m.group(1))
+    return constraints
+
+def constraint_sql(constraints: Dict[str, Any], next_param: int) -> Tuple[str, List[Any]]:
+    """
+    WHERE fragment (B-tree sargable) plus its arguments, numbered from $next_param.
+    An IP code is only adequate if both digits (solids, liquids) meet the requirement;
+    ip_code >= required is implied by that and lets the index narrow the range.
+    """
+    clauses, args = [], []
+
+    def param(value) -> str:
+        args.append(value)
+        return f"${next_param + len(args) - 1}"
+
+    if "watts" in constraints:
+        tolerance = settings.spec_wattage_tolerance
+        clauses.append(
+            f"watts BETWEEN {param(constraints['watts'] * (1 - tolerance))}::numeric "
+            f"AND {param(constraints['watts'] * (1 + tolerance))}::numeric"
+        )
+    if "kelvin" in constraints:
+        clauses.append(f"kelvin = {param(constraints['kelvin'])}::integer")
+    if "ip_code" in constraints:
+        ip = param(constraints["ip_code"])
+        clauses.append(
+            f"ip_code >= {ip}::integer AND ip_code / 10 >= {ip}::integer / 10 AND ip_code % 10 >= {ip}::integer % 10"
+        )
+    return " AND ".join(clauses), args
+
+def preference_sql(constraints: Dict[str, Any], next_param: int) -> Tuple[str, List[Any]]:
+    """
+    ORDER BY prefix (with trailing ", ") ranking exact attribute matches first among
+    rows that already pass constraint_sql: the requested wattage over one within
+    tolerance, the requested IP code over a higher one. Arguments numbered from $next_param.
+    """
+    terms, args = [], []
+    if "watts" in constraints:
+        args.append(constraints["watts"])
+        terms.append(f"(watts = ${next_param + len(args) - 1}::numeric) DESC")
+    if "ip_code" in constraints:
+        args.append(constraints["ip_code"])
+        terms.append(f"(ip_code = ${next_param + len(args) - 1}::integer) DESC")
+    return "".join(f"{t}, " for t in terms), args
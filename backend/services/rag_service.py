@@ -1,12 +1,32 @@
+import asyncio
 import re
 from typing import List, Dict, Any
-from services.embeddings import embed_text
+from core.config import get_settings
+from services.embeddings import embed_query
+from services import embedding_jobs, hybrid_search, vector_indexes, vector_storage
 from core.database import execute, fetch, fetchval
 
+settings = get_settings()
+
 # Chunking settings
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 
+# Text search configuration of rag_chunks.content_tsv: drops stop words (the OR query would
+# match them everywhere) while model codes, IP67 and DALI stay single tokens
+TS_CONFIG = "english"
+
+async def ensure_rag_search_column():
+    """Automatically add the generated tsvector column on rag_chunks and its GIN index."""
+    try:
+        await execute(f"""
+            ALTER TABLE rag_chunks ADD COLUMN IF NOT EXISTS content_tsv tsvector
+            GENERATED ALWAYS AS (to_tsvector('{TS_CONFIG}', coalesce(content, ''))) STORED
+        """)
+        await execute("CREATE INDEX IF NOT EXISTS idx_rag_chunks_content_tsv ON rag_chunks USING gin (content_tsv)")
+    except Exception as e:
+        print(f"Warning: Could not add rag_chunks.content_tsv: {e}")
+
 def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
     """Splits text into overlapping chunks."""
     text = re.sub(r'\s+', ' ', text).strip()
@@ -20,37 +40,72 @@ def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVE
     return chunks
 
 async def process_document(doc_id: int, text: str):
-    """Chunks text, generates embeddings, and stores them."""
+    """
+    Chunks text, stores the chunks and queues their embeddings.
+    The embedding worker marks the document processed once every chunk is embedded.
+    """
     chunks = chunk_text(text)
-    
-    for i, chunk in enumerate(chunks):
-        vector = await embed_text(chunk)
-        if vector:
-            await execute(
-                """
-                INSERT INTO rag_chunks (document_id, chunk_index, content, embedding)
-                VALUES ($1, $2, $3, $4)
-                """,
-                doc_id, i, chunk, str(vector)
-            )
-            
-    await execute("UPDATE rag_documents SET processed = TRUE WHERE id = $1", doc_id)
+    if not chunks:
+        await execute("UPDATE rag_documents SET processed = TRUE WHERE id = $1", doc_id)
+        return
 
-async def retrieve_context(query: str, top_k: int = 5) -> str:
-    """Retrieves relevant document chunks for a query."""
-    vector = await embed_text(query)
-    if not vector: return ""
-    
     rows = await fetch(
         """
-        SELECT content, 1 - (embedding <=> $1) as score
-        FROM rag_chunks
-        ORDER BY embedding <=> $1
+        INSERT INTO rag_chunks (document_id, chunk_index, content)
+        SELECT $1, i - 1, c FROM unnest($2::text[]) WITH ORDINALITY AS t(c, i)
+        RETURNING id
+        """,
+        doc_id, chunks
+    )
+    await embedding_jobs.enqueue("rag_chunks", [r['id'] for r in rows])
+
+async def _lexical_leg(query: str, limit: int) -> List[Dict[str, Any]]:
+    # Any query term may match (OR), ranked by cover density; exact tokens score highest
+    rows = await fetch(
+        f"""
+        SELECT id, content
+        FROM rag_chunks, (SELECT replace(plainto_tsquery('{TS_CONFIG}', $1)::text, '&', '|')::tsquery AS q) t
+        WHERE content_tsv @@ q
+        ORDER BY ts_rank_cd(content_tsv, q) DESC, id
         LIMIT $2
         """,
-        str(vector), top_k
+        query, limit
     )
-    
+    return [dict(r) for r in rows]
+
+async def _vector_leg(query: str, limit: int) -> List[Dict[str, Any]]:
+    vector = await embed_query(query, table="rag_chunks")
+    if vector is None or not len(vector):
+        return []
+    sql = vector_storage.nearest_sql("rag_chunks", "id, content")
+    return [dict(r) for r in await vector_indexes.search_fetch("rag_chunks", sql, vector, limit, top_k=limit)]
+
+async def retrieve_context(query: str, top_k: int = 5) -> str:
+    """
+    Retrieves relevant document chunks for a query: a full-text leg and a vector leg
+    run concurrently and are merged by reciprocal rank (weights RAG_LEXICAL_WEIGHT /
+    RAG_VECTOR_WEIGHT). Either leg alone still answers if the other fails.
+    """
+    limit = max(top_k, settings.hybrid_candidates)
+    lexical, dense = await asyncio.gather(
+        _lexical_leg(query, limit), _vector_leg(query, limit), return_exceptions=True
+    )
+    legs = []
+    for name, leg in (("lexical", lexical), ("vector", dense)):
+        if isinstance(leg, Exception):
+            print(f"⚠️ RAG {name} retrieval failed: {leg}")
+            leg = []
+        legs.append(leg)
+    if isinstance(lexical, Exception) and isinstance(dense, Exception):
+        raise dense
+
+    content = {r["id"]: r["content"] for leg in legs for r in leg}
+    fused = hybrid_search.rrf_merge(
+        [[r["id"] for r in leg] for leg in legs],
+        weights=[settings.rag_lexical_weight, settings.rag_vector_weight],
+        limit=top_k
+    )
+
     # Concatenate chunks to form context
-    context = "\n\n".join([r['content'] for r in rows])
-    return context
\ No newline at end of file
+    context = "\n\n".join([content[f["id"]] for f in fused])
+    return context
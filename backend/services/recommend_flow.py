@@ -38,7 +38,7 @@ async def generate_recommendations(user_id: int, top_k: int = 20) -> Dict[str, A
 
     # 3) Embed summary (cache and reuse)
     user_vector = await get_cached_user_embedding(user_id)
-    if not user_vector:
+    if user_vector is None:
         user_vector = await embed_and_store_user(user_id, summary or "General learner profile")
 
     # 4) Vector search
@@ -0,0 +1,232 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+from core.config import get_settings
+from core.database import get_db_pool, fetch, fetchrow, fetchval, execute, executemany
+from services import embedding_jobs, embedding_models, neighbors, product_families, search_cache, vector_storage
+from services.embeddings import embed_texts
+
+settings = get_settings()
+
+# Re-embedding works on the same tables the embedding queue knows how to build text for
+TABLES = tuple(embedding_jobs.SOURCE_COLUMNS)
+
+def _check_table(table: str):
+    if table not in TABLES:
+        raise ValueError(f"Unsupported table: {table} (choose from {list(TABLES)})")
+
+async def _wait_for_writers():
+    # Other processes only notice a registry change once their cached view expires
+    await asyncio.sleep(settings.embedding_model_refresh_seconds)
+
+async def _clear_user_vectors():
+    """
+    User profile vectors are embedded with the items model and only rebuilt when
+    missing, so an items flip has to drop them; recommend_flow re-embeds on next use.
+    """
+    try:
+        await execute("UPDATE users SET embedding = NULL WHERE embedding IS NOT NULL")
+        if await fetchval("SELECT to_regclass('embeddings_users')"):
+            await execute("DELETE FROM embeddings_users")
+    except Exception as e:
+        print(f"⚠️ Could not clear user embeddings after the items flip: {e}")
+
+async def start(table: str, model: str, shards: int = 4) -> Dict[str, Any]:
+    """
+    Register a re-embed of `table` into `model` and prepare the shadow column.
+    Resuming an existing migration to the same model keeps its shard checkpoints.
+    """
+    _check_table(table)
+    current = await fetchrow(
+        "SELECT target_model, status FROM embedding_migrations WHERE table_name = $1", table
+    )
+    if current and current["status"] == "flipped":
+        raise ValueError(f"{table} was already flipped to {current['target_model']}; run finalize first")
+    if current and current["target_model"] != model:
+        raise ValueError(f"{table} is already migrating to {current['target_model']}")
+
+    await execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS embedding_next vector(768)")
+    await execute(
+        f"CREATE INDEX IF NOT EXISTS {table}_embedding_next_idx "
+        f"ON {table} USING hnsw (embedding_next {vector_storage.index_opclass(table)})"
+    )
+
+    if not current:
+        await execute(
+            "INSERT INTO embedding_migrations (table_name, target_model) VALUES ($1, $2)", table, model
+        )
+        bounds = await fetchrow(f"SELECT MIN(id) AS lo, MAX(id) AS hi FROM {table}")
+        lo, hi = bounds["lo"] or 0, bounds["hi"] or 0
+        shards = max(1, shards)
+        step = (hi - lo) // shards + 1
+        await executemany(
+            """
+            INSERT INTO embedding_migration_shards (table_name, shard, lo, hi, last_id)
+            VALUES ($1, $2, $3, $4, $3 - 1)
+            """,
+            [(table, i, lo + i * step, min(hi, lo + (i + 1) * step - 1)) for i in range(shards)]
+        )
+        embedding_models.invalidate()
+        await _wait_for_writers()
+    return await status(table)
+
+async def _run_shard(table: str, target: str, shard: Dict[str, Any], batch_size: int) -> int:
+    columns = embedding_jobs.SOURCE_COLUMNS[table]
+    last_id, done = shard["last_id"], 0
+    while True:
+        rows = [dict(r) for r in await fetch(
+            f"SELECT {columns} FROM {table} WHERE id > $1 AND id <= $2 ORDER BY id LIMIT $3",
+            last_id, shard["hi"], batch_size
+        )]
+        if not rows:
+            break
+        vectors = await embed_texts([embedding_jobs.source_text(table, r) for r in rows], model=target)
+        # Rows a writer already dual-wrote hold a fresher vector than the text we read
+        await executemany(
+            f"UPDATE {table} SET embedding_next = $1 WHERE id = $2 AND embedding_next IS NULL",
+            [(v, r["id"]) for r, v in zip(rows, vectors)]
+        )
+        last_id = rows[-1]["id"]
+        done += len(rows)
+        await execute(
+            "UPDATE embedding_migration_shards SET last_id = $3 WHERE table_name = $1 AND shard = $2",
+            table, shard["shard"], last_id
+        )
+    await execute(
+        "UPDATE embedding_migration_shards SET done = TRUE WHERE table_name = $1 AND shard = $2",
+        table, shard["shard"]
+    )
+    return done
+
+async def run_shards(table: str, batch_size: Optional[int] = None) -> int:
+    """
+    Re-embed every unfinished shard concurrently, checkpointing after each batch,
+    then catch up rows that appeared outside the shard ranges. Returns rows embedded.
+    """
+    _check_table(table)
+    target = await fetchval(
+        "SELECT target_model FROM embedding_migrations WHERE table_name = $1 AND status = 'running'", table
+    )
+    if not target:
+        raise ValueError(f"No running migration for {table}; run start first")
+    batch_size = batch_size or settings.embedding_batch_size
+
+    shards = [dict(r) for r in await fetch(
+        "SELECT shard, lo, hi, last_id FROM embedding_migration_shards WHERE table_name = $1 AND NOT done ORDER BY shard",
+        table
+    )]
+    counts = await asyncio.gather(*(_run_shard(table, target, s, batch_size) for s in shards))
+    total = sum(counts)
+
+    # Rows inserted before writers picked up the migration, or past the original max id
+    columns = embedding_jobs.SOURCE_COLUMNS[table]
+    while True:
+        rows = [dict(r) for r in await fetch(
+            f"SELECT {columns} FROM {table} WHERE embedding_next IS NULL ORDER BY id LIMIT $1", batch_size
+        )]
+        if not rows:
+            break
+        vectors = await embed_texts([embedding_jobs.source_text(table, r) for r in rows], model=target)
+        await executemany(
+            f"UPDATE {table} SET embedding_next = $1 WHERE id = $2 AND embedding_next IS NULL",
+            [(v, r["id"]) for r, v in zip(rows, vectors)]
+        )
+        total += len(rows)
+    return total
+
+async def flip(table: str):
+    """
+    Atomically swap embedding_next in as the served column.
+    The old vectors stay in embedding_prev until finalize, so a flip can be undone by hand.
+    """
+    _check_table(table)
+    target = await fetchval(
+        "SELECT target_model FROM embedding_migrations WHERE table_name = $1 AND status = 'running'", table
+    )
+    if not target:
+        raise ValueError(f"No running migration for {table}")
+    remaining = await fetchval(f"SELECT COUNT(*) FROM {table} WHERE embedding_next IS NULL")
+    if remaining:
+        raise ValueError(f"{remaining} rows in {table} have no embedding_next yet; run the shards again")
+
+    # Generated quantized copies are bound to the old column; rebuild them afterwards
+    quantized = []
+    if table in vector_storage.TABLES:
+        present = {
+            r["column_name"] for r in await fetch(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = $1", table
+            )
+        }
+        quantized = [mode for mode, spec in vector_storage.MODES.items() if spec["column"] in present]
+
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            for mode in quantized:
+                column = vector_storage.MODES[mode]["column"]
+                await conn.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {column}")
+            await conn.execute(f"DROP INDEX IF EXISTS {table}_embedding_missing_idx")
+            await conn.execute(f"ALTER INDEX IF EXISTS {table}_embedding_idx RENAME TO {table}_embedding_prev_idx")
+            await conn.execute(f"ALTER TABLE {table} RENAME COLUMN embedding TO embedding_prev")
+            await conn.execute(f"ALTER TABLE {table} RENAME COLUMN embedding_next TO embedding")
+            await conn.execute(f"ALTER INDEX {table}_embedding_next_idx RENAME TO {table}_embedding_idx")
+            await conn.execute(
+                f"CREATE INDEX {table}_embedding_missing_idx ON {table} (id) WHERE embedding IS NULL"
+            )
+            await conn.execute(f"UPDATE {table} SET embedding_model = $1", target)
+            await conn.execute(
+                """
+                INSERT INTO embedding_models (table_name, model) VALUES ($1, $2)
+                ON CONFLICT (table_name) DO UPDATE SET model = EXCLUDED.model, updated_at = NOW()
+                """,
+                table, target
+            )
+            await conn.execute(
+                "UPDATE embedding_migrations SET status = 'flipped', flipped_at = NOW() WHERE table_name = $1",
+                table
+            )
+
+    for mode in quantized:
+        await vector_storage.migrate(table, mode)
+    await search_cache.bump(table)
+    await neighbors.invalidate(table)
+    if table == "items":
+        await _clear_user_vectors()
+    if table == "products":
+        # Centroids were averaged from the previous model's vectors
+        await product_families.rebuild()
+
+    # Writers still on the old model during their refresh window tagged rows with it
+    embedding_models.invalidate()
+    await _wait_for_writers()
+    if table == "items":
+        # Profiles embedded during the refresh window may have used the old model
+        await _clear_user_vectors()
+    stale = await fetch(
+        f"SELECT id FROM {table} WHERE embedding_model IS DISTINCT FROM $1", target
+    )
+    await embedding_jobs.enqueue(table, [r["id"] for r in stale])
+    return {"table": table, "model": target, "requeued": len(stale)}
+
+async def finalize(table: str):
+    """Drop the previous vectors once the flip has been verified."""
+    _check_table(table)
+    await execute(f"DROP INDEX IF EXISTS {table}_embedding_prev_idx")
+    await execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS embedding_prev")
+    await execute("DELETE FROM embedding_migration_shards WHERE table_name = $1", table)
+    await execute("DELETE FROM embedding_migrations WHERE table_name = $1", table)
+
+async def status(table: str) -> Dict[str, Any]:
+    _check_table(table)
+    migration = await fetchrow("SELECT * FROM embedding_migrations WHERE table_name = $1", table)
+    shards: List[Dict[str, Any]] = [
+        dict(r) for r in await fetch(
+            "SELECT shard, lo, hi, last_id, done FROM embedding_migration_shards WHERE table_name = $1 ORDER BY shard",
+            table
+        )
+    ]
+    return {
+        "table": table,
+        "active_model": await embedding_models.active_model(table),
+        "migration": {k: str(v) for k, v in dict(migration).items()} if migration else None,
+        "shards": shards,
+    }
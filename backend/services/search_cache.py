@@ -0,0 +1,93 @@
+import re
+from typing import Any, Awaitable, Callable, Dict
+from core.cache import LRUCache
+from core.config import get_settings
+from core.database import fetch, fetchval, execute
+
+settings = get_settings()
+
+# Catalogs whose search results are cached; a write to one bumps its version
+SCOPES = ("products", "opportunities")
+
+_results = LRUCache(maxsize=settings.search_cache_size, ttl=settings.search_cache_ttl_seconds)
+# Versions bumped by other processes are picked up within the refresh interval
+_versions = LRUCache(maxsize=len(SCOPES), ttl=settings.search_cache_version_refresh_seconds)
+_counters: Dict[str, Dict[str, int]] = {}
+
+async def ensure_search_versions_table():
+    """Automatically create the catalog version table if it doesn't exist."""
+    try:
+        await execute("""
+            CREATE TABLE IF NOT EXISTS search_versions (
+                scope TEXT PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0
+            );
+        """)
+    except Exception as e:
+        print(f"Warning: Could not check/create search_versions table: {e}")
+
+def normalize(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+async def version(scope: str) -> int:
+    current = _versions.get(scope)
+    if current is None:
+        try:
+            for r in await fetch("SELECT scope, version FROM search_versions"):
+                _versions.set(r["scope"], r["version"])
+            current = _versions.get(scope)
+        except Exception as e:
+            print(f"⚠️ Could not read search versions: {e}")
+        if current is None:
+            current = 0
+            _versions.set(scope, current)
+    return current
+
+async def bump(scope: str):
+    """
+    Make every cached result for `scope` unreachable: entries keyed on the old
+    version are never looked up again and age out of the LRU.
+    """
+    if scope not in SCOPES:
+        return
+    try:
+        new = await fetchval(
+            """
+            INSERT INTO search_versions (scope, version) VALUES ($1, 1)
+            ON CONFLICT (scope) DO UPDATE SET version = search_versions.version + 1
+            RETURNING version
+            """,
+            scope
+        )
+    except Exception as e:
+        # Still invalidate this process; others catch up when their TTL expires
+        print(f"⚠️ Could not bump search version for {scope}: {e}")
+        new = await version(scope) + 1
+    _versions.set(scope, new)
+
+async def cached(
+    endpoint: str, scope: str, query: str, top_k: int, compute: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Return the cached result for (endpoint, normalized query, top_k, catalog version), or compute it.
+    Errors raised by `compute` propagate uncached; empty results are not cached either.
+    """
+    counters = _counters.setdefault(endpoint, {"hits": 0, "misses": 0})
+    key = (endpoint, normalize(query), top_k, await version(scope))
+    result = _results.get(key)
+    if result is not None:
+        counters["hits"] += 1
+        return result
+    counters["misses"] += 1
+    result = await compute()
+    # Searches return [] when the database call fails; never pin that as the answer
+    if result:
+        _results.set(key, result)
+    return result
+
+def stats() -> Dict[str, Any]:
+    endpoints = {}
+    for endpoint, c in _counters.items():
+        total = c["hits"] + c["misses"]
+        endpoints[endpoint] = {**c, "hit_ratio": round(c["hits"] / total, 4) if total else 0.0}
+    return {**_results.stats(), "endpoints": endpoints}
@@ -0,0 +1,263 @@
+import asyncio
+import math
+from typing import Any, Dict, List, Optional
+from core.config import get_settings
+from core.database import get_db_pool, fetch, fetchrow, fetchval, execute
+from services import vector_storage
+
+settings = get_settings()
+
+# profile -> hnsw.ef_search, and ivfflat.probes as a multiple of sqrt(lists)
+PROFILES = {
+    "fast": {"ef_search": 40, "probe_factor": 0.5},
+    "balanced": {"ef_search": 100, "probe_factor": 1.0},
+    "accurate": {"ef_search": 200, "probe_factor": 2.0},
+}
+
+# Only one process (of any worker count) plans and builds at a time
+_MAINTENANCE_LOCK = 7_340_021
+
+# table -> {"method", "name", "lists"} of the live ANN index on `embedding` (filled by refresh)
+_live: Dict[str, Dict[str, Any]] = {}
+
+async def ensure_vector_index_table():
+    """Automatically create the index build log if it doesn't exist."""
+    try:
+        await execute("""
+            CREATE TABLE IF NOT EXISTS vector_index_builds (
+                table_name TEXT PRIMARY KEY,
+                index_name TEXT NOT NULL,
+                method TEXT NOT NULL,
+                opclass TEXT NOT NULL,
+                lists INTEGER,
+                rows_at_build BIGINT NOT NULL,
+                built_at TIMESTAMPTZ DEFAULT NOW()
+            );
+        """)
+    except Exception as e:
+        print(f"Warning: Could not check/create vector_index_builds table: {e}")
+
+async def _current_indexes() -> Dict[str, Dict[str, Any]]:
+    rows = await fetch(
+        """
+        SELECT c.relname AS table_name, i.relname AS index_name, am.amname AS method,
+               oc.opcname AS opclass, i.reloptions AS options, pg_relation_size(i.oid) AS bytes
+        FROM pg_index x
+        JOIN pg_class c ON c.oid = x.indrelid
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_am am ON am.oid = i.relam
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = x.indkey[0]
+        JOIN pg_opclass oc ON oc.oid = x.indclass[0]
+        WHERE a.attname = 'embedding' AND am.amname IN ('hnsw', 'ivfflat')
+          AND c.relname = ANY($1::text[])
+        """,
+        list(vector_storage.SEARCH_TABLES)
+    )
+    current = {}
+    for r in rows:
+        options = dict(o.split("=", 1) for o in (r["options"] or []))
+        current[r["table_name"]] = {
+            "name": r["index_name"],
+            "method": r["method"],
+            "opclass": r["opclass"],
+            "lists": int(options["lists"]) if "lists" in options else None,
+            "bytes": r["bytes"],
+        }
+    return current
+
+async def refresh() -> Dict[str, Dict[str, Any]]:
+    """Reload which index serves each table (after startup or a rebuild)."""
+    current = await _current_indexes()
+    _live.clear()
+    _live.update(current)
+    await vector_storage.detect_index_metrics()
+    return current
+
+def choose(rows: int) -> Dict[str, Any]:
+    """
+    Index shape for a table with `rows` embeddings: none below VECTOR_INDEX_MIN_ROWS
+    (an exact scan is as fast and has perfect recall), HNSW up to VECTOR_INDEX_HNSW_MAX_ROWS,
+    ivfflat beyond that where HNSW build time and memory get prohibitive.
+    """
+    if rows < settings.vector_index_min_rows:
+        return {"method": None, "lists": None}
+    if rows <= settings.vector_index_hnsw_max_rows:
+        return {"method": "hnsw", "lists": None}
+    # pgvector guidance: rows / 1000 lists up to 1M rows, sqrt(rows) beyond
+    lists = rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows))
+    return {"method": "ivfflat", "lists": max(1, lists)}
+
+async def plan(table: str) -> Dict[str, Any]:
+    """Compare the live index with what the table's size calls for."""
+    n = await fetchval(f"SELECT COUNT(*) FROM {table} WHERE embedding IS NOT NULL")
+    current = (await _current_indexes()).get(table)
+    build = await fetchrow("SELECT * FROM vector_index_builds WHERE table_name = $1", table)
+    target = choose(n)
+
+    action, reason = "keep", "index matches table size"
+    if target["method"] is None:
+        if current and current["method"] == "ivfflat":
+            # Lists trained on (almost) nothing leave most probes empty: worse than a scan
+            action, reason = "drop", f"ivfflat on {n} rows (< VECTOR_INDEX_MIN_ROWS) loses recall"
+        elif current:
+            reason = f"{n} rows is below VECTOR_INDEX_MIN_ROWS; existing index kept"
+        else:
+            reason = f"{n} rows; exact scan until VECTOR_INDEX_MIN_ROWS"
+    elif not current:
+        action, reason = "build", "no ANN index on embedding"
+    elif current["method"] != target["method"]:
+        action, reason = "build", f"{current['method']} -> {target['method']} at {n} rows"
+    elif current["method"] == "ivfflat":
+        rows_at_build = build["rows_at_build"] if build and build["index_name"] == current["name"] else 0
+        if rows_at_build * settings.vector_index_growth_factor <= n:
+            action = "build"
+            reason = (
+                f"grew from {rows_at_build} to {n} rows since the lists were trained"
+                if rows_at_build else "ivfflat built outside the manager (lists trained on unknown data)"
+            )
+    return {
+        "table": table,
+        "rows": n,
+        "current": current,
+        "last_build": {k: str(v) for k, v in dict(build).items()} if build else None,
+        "target": target,
+        "action": action,
+        "reason": reason,
+    }
+
+async def build(table: str, method: str, lists: Optional[int], rows: int):
+    """
+    Build the new index CONCURRENTLY next to the old one, then swap names, so
+    searches keep an index throughout. Keeps the table's opclass (default inner product).
+    """
+    current = (await _current_indexes()).get(table)
+    opclass = current["opclass"] if current else vector_storage.DEFAULT_OPCLASS
+    canonical = f"{table}_embedding_idx"
+    staging = f"{table}_embedding_idx_new"
+    with_clause = f"WITH (lists = {lists})" if method == "ivfflat" else "WITH (m = 16, ef_construction = 64)"
+
+    await execute(f"DROP INDEX CONCURRENTLY IF EXISTS {staging}")
+    await execute(
+        f"CREATE INDEX CONCURRENTLY {staging} ON {table} USING {method} (embedding {opclass}) {with_clause}"
+    )
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if current:
+                await conn.execute(f"DROP INDEX IF EXISTS {current['name']}")
+            await conn.execute(f"DROP INDEX IF EXISTS {canonical}")
+            await conn.execute(f"ALTER INDEX {staging} RENAME TO {canonical}")
+            await conn.execute(
+                """
+                INSERT INTO vector_index_builds (table_name, index_name, method, opclass, lists, rows_at_build)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                ON CONFLICT (table_name) DO UPDATE SET
+                    index_name = EXCLUDED.index_name, method = EXCLUDED.method, opclass = EXCLUDED.opclass,
+                    lists = EXCLUDED.lists, rows_at_build = EXCLUDED.rows_at_build, built_at = NOW()
+                """,
+                table, canonical, method, opclass, lists, rows
+            )
+    await refresh()
+
+async def drop(table: str):
+    current = (await _current_indexes()).get(table)
+    if current:
+        await execute(f"DROP INDEX CONCURRENTLY IF EXISTS {current['name']}")
+    await execute("DELETE FROM vector_index_builds WHERE table_name = $1", table)
+    await refresh()
+
+async def maintain(apply: bool = True) -> List[Dict[str, Any]]:
+    """Plan every searched table and (optionally) carry out the rebuilds."""
+    plans = []
+    for table in vector_storage.SEARCH_TABLES:
+        # One missing or failing table must not stop maintenance of the others
+        try:
+            p = await plan(table)
+        except Exception as e:
+            print(f"⚠️ Could not plan vector index for {table}: {e}")
+            plans.append({"table": table, "rows": None, "current": None, "action": "error", "reason": str(e)})
+            continue
+        try:
+            if apply and p["action"] == "build":
+                print(f"🔄 Building {p['target']['method']} index on {table}: {p['reason']}")
+                await build(table, p["target"]["method"], p["target"]["lists"], p["rows"])
+                p["action"] = "built"
+            elif apply and p["action"] == "drop":
+                print(f"🔄 Dropping index on {table}: {p['reason']}")
+                await drop(table)
+                p["action"] = "dropped"
+        except Exception as e:
+            print(f"⚠️ Vector index maintenance failed for {table}: {e}")
+            p["action"], p["reason"] = "error", str(e)
+        plans.append(p)
+    return plans
+
+async def run_maintainer(stop: asyncio.Event):
+    """Background loop: re-plan indexes periodically as tables grow."""
+    while not stop.is_set():
+        try:
+            pool = await get_db_pool()
+            async with pool.acquire() as conn:
+                if await conn.fetchval("SELECT pg_try_advisory_lock($1)", _MAINTENANCE_LOCK):
+                    try:
+                        await maintain()
+                    finally:
+                        await conn.execute("SELECT pg_advisory_unlock($1)", _MAINTENANCE_LOCK)
+                else:
+                    # Another process is maintaining; just pick up what it built
+                    await refresh()
+        except Exception as e:
+            print(f"⚠️ Vector index maintenance failed: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.vector_index_check_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+def search_settings(table: str, top_k: int, profile: Optional[str] = None) -> Dict[str, int]:
+    """
+    Planner settings for one search on `table` under a latency/recall profile.
+    ef_search never drops below the rows the scan must return, or HNSW returns fewer.
+    Quantized tables scan the compact column's HNSW index for the oversampled candidate
+    set (see vector_storage.nearest_sql), so that is what ef_search has to cover.
+    """
+    spec = PROFILES.get((profile or settings.vector_search_profile).lower(), PROFILES["balanced"])
+    if vector_storage.quantized_mode(table):
+        candidates = top_k * max(1, settings.vector_rescore_oversample)
+        return {"hnsw.ef_search": min(1000, max(spec["ef_search"], candidates))}
+    index = _live.get(table)
+    if not index:
+        return {}
+    if index["method"] == "hnsw":
+        return {"hnsw.ef_search": min(1000, max(spec["ef_search"], top_k))}
+    lists = index["lists"] or 100
+    return {"ivfflat.probes": max(1, min(lists, round(math.sqrt(lists) * spec["probe_factor"])))}
+
+async def search_fetch(table: str, query: str, *args, top_k: int, profile: Optional[str] = None):
+    """
+    fetch() for a vector search, with ef_search/probes applied to this query only.
+    All settings go in one set_config round trip ahead of the query; they are
+    session-level, and the pool's RESET ALL on release keeps them from leaking.
+    """
+    params = search_settings(table, top_k, profile)
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        if params:
+            calls = ", ".join(f"set_config(${2 * i + 1}, ${2 * i + 2}, false)" for i in range(len(params)))
+            values = [v for name, value in params.items() for v in (name, str(int(value)))]
+            await conn.execute(f"SELECT {calls}", *values)
+        return await conn.fetch(query, *args)
+
+async def health() -> Dict[str, Any]:
+    """Per-table index health for the admin endpoint."""
+    usage = {
+        r["indexrelname"]: r["idx_scan"] for r in await fetch(
+            "SELECT indexrelname, idx_scan FROM pg_stat_user_indexes WHERE relname = ANY($1::text[])",
+            list(vector_storage.SEARCH_TABLES)
+        )
+    }
+    plans = await maintain(apply=False)
+    for p in plans:
+        if p["current"]:
+            p["current"]["scans"] = usage.get(p["current"]["name"], 0)
+        p["search_settings"] = search_settings(p["table"], top_k=10)
+    return {"profile": settings.vector_search_profile, "tables": plans}
@@ -1,28 +1,29 @@
-from typing import List, Dict, Any, Iterable
-from core.database import fetch
-from core.utils import to_pgvector_literal
+import numpy as np
+from typing import List, Dict, Any, Iterable, Sequence
+from core.database import vector_array
+from core.config import get_settings
+from services import product_families, product_index, product_specs, vector_indexes, vector_storage
+
+settings = get_settings()
+
+_PRODUCT_COLUMNS = "id, title, description, price, wattage, cct, ip_rating"
 
 async def search_similar_items(embedding: Iterable[float], top_k: int = 20) -> List[Dict[str, Any]]:
     """
     Original function: Search for similar items (courses) in the 'items' table.
     """
-    vec_literal = to_pgvector_literal(embedding)
+    vec = np.asarray(embedding, dtype=np.float32)
     try:
-        rows = await fetch(
-            """
-            SELECT id, title, description, category, tags, difficulty,
-                   (1.0 / (1.0 + (embedding <-> $1::vector))) as similarity
-            FROM items
-            WHERE embedding IS NOT NULL
-            ORDER BY embedding <-> $1::vector
-            LIMIT $2
-            """,
-            vec_literal,
+        rows = await vector_indexes.search_fetch(
+            "items",
+            vector_storage.nearest_sql("items", "id, title, description, category, tags, difficulty"),
+            vec,
             int(top_k),
+            top_k=int(top_k),
         )
         results: List[Dict[str, Any]] = []
         for r in rows:
-            similarity = float(r["similarity"]) if r["similarity"] else 0.5
+            similarity = float(r["similarity"]) if r["similarity"] is not None else 0.0
             results.append(
                 {
                     "id": r["id"],
@@ -43,35 +44,159 @@ async def search_similar_products(embedding: Iterable[float], top_k: int = 5) ->
     """
     New function: Search for similar lighting products in the 'products' table for Quotations.
     """
-    if not embedding:
+    if embedding is None or not len(embedding):
         return []
 
-    # Ensure embedding is a string literal for pgvector if passed as list
-    # The 'to_pgvector_literal' util handles lists -> string format '[...]'
-    vec_literal = to_pgvector_literal(embedding)
+    # Sent through the pool's binary pgvector codec, no text literal needed
+    vec = np.asarray(embedding, dtype=np.float32)
 
+    # In-process index when loaded; Postgres remains the fallback and source of truth
     try:
-        rows = await fetch(
-            """
-            SELECT id, title, description, price, wattage, cct, ip_rating, 
-                   (1.0 / (1.0 + (embedding <-> $1::vector))) as similarity
-            FROM products
-            WHERE embedding IS NOT NULL
-            ORDER BY embedding <-> $1::vector
-            LIMIT $2
-            """,
-            vec_literal,
-            int(top_k),
-        )
+        if await product_index.current():
+            return product_index.search(vec, int(top_k))
+    except Exception as e:
+        print(f"In-process product search failed, using Postgres: {e}")
+
+    # Operator matches the products index; quantized storage adds an exact re-score
+    query = vector_storage.nearest_sql("products", _PRODUCT_COLUMNS)
+
+    try:
+        rows = await vector_indexes.search_fetch("products", query, vec, int(top_k), top_k=int(top_k))
         
         results = []
         for row in rows:
             r = dict(row)
             # Normalize score key to match what agent expects
-            r['score'] = float(r['similarity']) if r['similarity'] else 0.0
+            r['score'] = float(r['similarity']) if r['similarity'] is not None else 0.0
             results.append(r)
             
         return results
     except Exception as e:
         print(f"Product search failed: {e}")
-        return []
\ No newline at end of file
+        return []
+
+async def search_similar_products_many(
+    embeddings: Sequence[Iterable[float]],
+    top_k: int = 5
+) -> List[List[Dict[str, Any]]]:
+    """
+    search_similar_products for many query vectors at once: one SQL round trip
+    (or in-process lookups) instead of one per requirement line.
+    Returns one result list per embedding, in input order.
+    """
+    vectors = [np.asarray(e, dtype=np.float32) for e in embeddings]
+    if not vectors:
+        return []
+
+    try:
+        if await product_index.current():
+            return [product_index.search(v, int(top_k)) for v in vectors]
+    except Exception as e:
+        print(f"In-process product search failed, using Postgres: {e}")
+
+    results: List[List[Dict[str, Any]]] = [[] for _ in vectors]
+    try:
+        rows = await vector_indexes.search_fetch(
+            "products",
+            vector_storage.nearest_many_sql("products", _PRODUCT_COLUMNS),
+            vector_array(vectors),
+            int(top_k),
+            top_k=int(top_k)
+        )
+    except Exception as e:
+        print(f"Product search failed: {e}")
+        return results
+    for row in rows:
+        r = dict(row)
+        position = r.pop("query_index") - 1
+        r['score'] = float(r['similarity']) if r['similarity'] is not None else 0.0
+        results[position].append(r)
+    return results
+
+async def search_products_with_specs(
+    embeddings: Sequence[Iterable[float]],
+    constraints: Sequence[Dict[str, Any]],
+    top_k: int = 5
+) -> List[List[Dict[str, Any]]]:
+    """
+    Batched product matching with hard spec constraints applied in SQL before ranking
+    (see product_specs.requirement_constraints). One round trip for all lines: each
+    constrained line ranks only its matching candidates exactly, the rest use the ANN index.
+    With product families built, every line ranks families first and takes the best
+    variant (exact attribute matches first) of each; lines no top family satisfies
+    retry across the whole catalog. Unconstrained lines use the in-process product
+    index instead whenever it is loaded and current.
+    Lines whose constraints match nothing fall back to plain similarity;
+    every result carries `spec_match` saying which path produced it.
+    """
+    vectors = [np.asarray(e, dtype=np.float32) for e in embeddings]
+    families = product_families.enabled()
+    results: List[List[Dict[str, Any]]] = [[] for _ in vectors]
+
+    # Unconstrained lines go to the in-process index when it serves; otherwise they
+    # share the single spec/family round trip (or all are plain without families)
+    plain = []
+    if await product_index.current() or (not families and not any(constraints)):
+        plain = [i for i, spec in enumerate(constraints) if not spec]
+    if plain:
+        found = await search_similar_products_many([vectors[i] for i in plain], top_k)
+        for i, rs in zip(plain, found):
+            results[i] = [{**r, "spec_match": False} for r in rs]
+
+    ranked = sorted(set(range(len(vectors))) - set(plain))
+    if ranked:
+        found = await _spec_search([vectors[i] for i in ranked], [constraints[i] for i in ranked], top_k, families)
+        for i, rs in zip(ranked, found):
+            results[i] = rs
+    if families:
+        missed = [i for i, rs in enumerate(results) if not rs and constraints[i]]
+        if missed:
+            retry = await _spec_search([vectors[i] for i in missed], [constraints[i] for i in missed], top_k, False)
+            for i, rs in zip(missed, retry):
+                results[i] = rs
+
+    # Nothing in the catalog meets the spec: still offer the closest products
+    unmatched = [i for i, rs in enumerate(results) if not rs]
+    if unmatched:
+        fallback = await search_similar_products_many([vectors[i] for i in unmatched], top_k)
+        for i, rs in zip(unmatched, fallback):
+            results[i] = [{**r, "spec_match": False} for r in rs]
+    return results
+
+async def _spec_search(
+    vectors: List[np.ndarray],
+    constraints: Sequence[Dict[str, Any]],
+    top_k: int,
+    families: bool
+) -> List[List[Dict[str, Any]]]:
+    branches, args = [], [int(top_k)]
+    for position, (vec, spec) in enumerate(zip(vectors, constraints)):
+        args.append(vec)
+        vector = f"${len(args)}::vector"
+        where, where_args = product_specs.constraint_sql(spec or {}, len(args) + 1)
+        args.extend(where_args)
+        if families:
+            prefer, prefer_args = product_specs.preference_sql(spec or {}, len(args) + 1)
+            args.extend(prefer_args)
+            inner = product_families.family_sql(
+                _PRODUCT_COLUMNS, where, vector, "$1", settings.product_family_candidates, prefer
+            )
+        elif where:
+            inner = vector_storage.prefiltered_sql("products", _PRODUCT_COLUMNS, where, vector=vector, limit="$1")
+        else:
+            inner = vector_storage.nearest_sql("products", _PRODUCT_COLUMNS, vector=vector, limit="$1")
+        branches.append(f"SELECT {position} AS query_index, {bool(where)} AS spec_match, b.* FROM ({inner}) b")
+
+    results: List[List[Dict[str, Any]]] = [[] for _ in vectors]
+    try:
+        rows = await vector_indexes.search_fetch(
+            "products", " UNION ALL ".join(branches), *args, top_k=int(top_k)
+        )
+    except Exception as e:
+        print(f"Spec-filtered product search failed: {e}")
+        rows = []
+    for row in rows:
+        r = dict(row)
+        r['score'] = float(r['similarity']) if r['similarity'] is not None else 0.0
+        results[r.pop("query_index")].append(r)
+    return results
@@ -0,0 +1,333 @@
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from core.config import get_settings
+from core.database import fetch, execute, executemany, get_db_pool
+
+settings = get_settings()
+
+# Tables with a vector(768) `embedding` column that may carry a quantized copy
+TABLES = ("products", "rag_chunks", "opportunities")
+# Every table searched by vector; items has no quantized copy
+SEARCH_TABLES = ("items",) + TABLES
+
+# ANN index opclass -> the operator that index serves, and that distance as cosine similarity.
+# Stored and query vectors are L2-normalized, so all three rank identically and the
+# similarity means the same thing on every table.
+METRICS = {
+    "vector_ip_ops": {"operator": "<#>", "similarity": "-({d})"},
+    "vector_cosine_ops": {"operator": "<=>", "similarity": "1 - ({d})"},
+    "vector_l2_ops": {"operator": "<->", "similarity": "1 - ({d}) ^ 2 / 2"},
+}
+# Used for tables without an ANN index: cheapest on unit vectors
+DEFAULT_OPCLASS = "vector_ip_ops"
+
+# mode -> (column, column type / generation expression, index opclass, distance to a query vector {v})
+# pgvector has no int8 vector type; binary quantization is its compact (1 bit/dim) tier.
+MODES = {
+    "halfvec": {
+        "column": "embedding_half",
+        "definition": "halfvec(768) GENERATED ALWAYS AS (embedding::halfvec(768)) STORED",
+        "opclass": "halfvec_cosine_ops",
+        "distance": "embedding_half <=> {v}::halfvec(768)",
+    },
+    "binary": {
+        "column": "embedding_bit",
+        "definition": "bit(768) GENERATED ALWAYS AS (binary_quantize(embedding)::bit(768)) STORED",
+        "opclass": "bit_hamming_ops",
+        "distance": "embedding_bit <~> binary_quantize({v})::bit(768)",
+    },
+}
+
+# Tables where the configured quantized column actually exists (filled by detect_quantized_tables)
+_active: Dict[str, str] = {}
+# table -> opclass of the ANN index on `embedding` (filled by detect_index_metrics)
+_opclasses: Dict[str, str] = {}
+
+async def detect_index_metrics() -> Dict[str, str]:
+    """Read which opclass each table's hnsw/ivfflat index on `embedding` was built with."""
+    rows = await fetch(
+        """
+        SELECT c.relname AS table_name, oc.opcname AS opclass
+        FROM pg_index x
+        JOIN pg_class c ON c.oid = x.indrelid
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_am am ON am.oid = i.relam
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = x.indkey[0]
+        JOIN pg_opclass oc ON oc.oid = x.indclass[0]
+        WHERE a.attname = 'embedding' AND am.amname IN ('hnsw', 'ivfflat')
+          AND c.relname = ANY($1::text[])
+        """,
+        list(SEARCH_TABLES)
+    )
+    _opclasses.clear()
+    for r in rows:
+        if r["opclass"] in METRICS:
+            _opclasses[r["table_name"]] = r["opclass"]
+    return dict(_opclasses)
+
+def index_opclass(table: str) -> str:
+    return _opclasses.get(table, DEFAULT_OPCLASS)
+
+def distance_sql(table: str, column: str = "embedding", vector: str = "$1::vector") -> str:
+    """Distance expression using the operator `table`'s ANN index can serve."""
+    return f"{column} {METRICS[index_opclass(table)]['operator']} {vector}"
+
+def similarity_sql(table: str, column: str = "embedding", vector: str = "$1::vector") -> str:
+    """Cosine similarity in [-1, 1], whatever the table's index metric."""
+    return METRICS[index_opclass(table)]["similarity"].format(d=distance_sql(table, column, vector))
+
+async def check_index_usage() -> List[str]:
+    """
+    EXPLAIN each table's top-k query with sequential scans disabled; a plan that still
+    scans the heap means no index matches the operator we emit. Returns the warnings.
+    """
+    probe = np.zeros(768, dtype=np.float32)
+    probe[0] = 1.0
+    warnings = []
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        for table in SEARCH_TABLES:
+            if table not in _opclasses:
+                warnings.append(f"{table}: no hnsw/ivfflat index on embedding; vector search scans every row")
+                continue
+            try:
+                async with conn.transaction():
+                    await conn.execute("SET LOCAL enable_seqscan = off")
+                    plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {nearest_sql(table, 'id')}", probe, 10)
+            except Exception as e:
+                warnings.append(f"{table}: could not EXPLAIN vector search ({e})")
+                continue
+            if "Index Scan" not in str(plan):
+                warnings.append(f"{table}: vector search does not use its {_opclasses[table]} index")
+    for w in warnings:
+        print(f"⚠️ {w}")
+    return warnings
+
+async def detect_quantized_tables() -> Dict[str, str]:
+    """
+    Check which tables carry the quantized copy for VECTOR_STORAGE_MODE.
+    Tables that have not been migrated keep searching the float32 column.
+    """
+    _active.clear()
+    mode = settings.vector_storage_mode.lower()
+    if mode not in MODES:
+        return dict(_active)
+    column = MODES[mode]["column"]
+    rows = await fetch(
+        "SELECT table_name FROM information_schema.columns WHERE column_name = $1 AND table_name = ANY($2::text[])",
+        column, list(TABLES)
+    )
+    for r in rows:
+        _active[r["table_name"]] = mode
+    missing = [t for t in TABLES if t not in _active]
+    if missing:
+        print(f"⚠️ VECTOR_STORAGE_MODE={mode} but {missing} not migrated; run vector_admin.py migrate")
+    return dict(_active)
+
+def quantized_mode(table: str) -> Optional[str]:
+    return _active.get(table)
+
+def nearest_sql(
+    table: str,
+    columns: str,
+    where: str = "embedding IS NOT NULL",
+    mode: Optional[str] = None,
+    vector: str = "$1::vector",
+    limit: str = "$2"
+) -> str:
+    """
+    Top-k query for `table` against query vector $1 with LIMIT $2
+    (`vector` / `limit` substitute other expressions, e.g. a LATERAL reference).
+
+    Orders by the operator matching the table's ANN index so the index is used.
+    Quantized tables rank an oversampled candidate set on the compact column (index-backed),
+    then re-score those candidates exactly against the float32 embedding.
+    Every query exposes `similarity` = cosine similarity (see METRICS).
+    `mode` overrides the detected storage mode ("full" forces the float32 column).
+    """
+    mode = mode or _active.get(table)
+    if mode not in MODES:
+        return f"""
+            SELECT {columns}, {similarity_sql(table, vector=vector)} AS similarity
+            FROM {table}
+            WHERE {where}
+            ORDER BY {distance_sql(table, vector=vector)}
+            LIMIT {limit}
+        """
+    spec = MODES[mode]
+    oversample = max(1, settings.vector_rescore_oversample)
+    return f"""
+        SELECT {columns}, {similarity_sql(table, vector=vector)} AS similarity
+        FROM (
+            SELECT * FROM {table}
+            WHERE {where}
+            ORDER BY {spec['distance'].format(v=vector)}
+            LIMIT {limit} * {oversample}
+        ) candidates
+        ORDER BY {distance_sql(table, vector=vector)}
+        LIMIT {limit}
+    """
+
+def prefiltered_sql(
+    table: str,
+    columns: str,
+    where: str,
+    vector: str = "$1::vector",
+    limit: str = "$2"
+) -> str:
+    """
+    Exact top-k among rows passing selective structured filters (B-tree indexed).
+    OFFSET 0 fences the candidate set so the ANN index cannot post-filter it
+    and come back with fewer than k rows.
+    """
+    return f"""
+        SELECT {columns}, {similarity_sql(table, vector=vector)} AS similarity
+        FROM (
+            SELECT * FROM {table}
+            WHERE embedding IS NOT NULL AND {where}
+            OFFSET 0
+        ) candidates
+        ORDER BY {distance_sql(table, vector=vector)}
+        LIMIT {limit}
+    """
+
+def nearest_many_sql(
+    table: str,
+    columns: str,
+    where: str = "embedding IS NOT NULL",
+    mode: Optional[str] = None
+) -> str:
+    """
+    Top-k for every query vector in the array $1 with LIMIT $2, in one statement.
+    Rows carry `query_index` (1-based position in $1); each LATERAL probe is a nearest_sql
+    query, so it uses the same index, operator and re-score path.
+    """
+    inner = nearest_sql(table, columns, where, mode, vector="q.vec", limit="$2")
+    return f"""
+        SELECT q.ord AS query_index, m.*
+        FROM unnest($1::vector[]) WITH ORDINALITY AS q(vec, ord)
+        CROSS JOIN LATERAL ({inner}) m
+        ORDER BY q.ord, m.similarity DESC
+    """
+
+async def migrate(table: str, mode: str):
+    """
+    Add the generated quantized column and its HNSW index. Idempotent.
+    The column is computed by Postgres from `embedding`, so no write path changes.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unsupported table: {table}")
+    if mode not in MODES:
+        raise ValueError(f"Unsupported mode: {mode} (choose from {list(MODES)})")
+    spec = MODES[mode]
+    await execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {spec['column']} {spec['definition']}")
+    await execute(
+        f"CREATE INDEX IF NOT EXISTS {table}_{spec['column']}_idx "
+        f"ON {table} USING hnsw ({spec['column']} {spec['opclass']})"
+    )
+
+async def drop(table: str, mode: str):
+    """Remove the quantized copy (rollback path)."""
+    spec = MODES[mode]
+    await execute(f"DROP INDEX IF EXISTS {table}_{spec['column']}_idx")
+    await execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {spec['column']}")
+
+async def normalize(table: str, batch_size: int = 500) -> int:
+    """
+    L2-normalize stored vectors written before embeddings were normalized on the way in.
+    Generated quantized columns follow automatically. Returns rows rewritten.
+    """
+    if table not in SEARCH_TABLES:
+        raise ValueError(f"Unsupported table: {table}")
+    last_id, changed = 0, 0
+    while True:
+        rows = await fetch(
+            f"SELECT id, embedding FROM {table} WHERE id > $1 AND embedding IS NOT NULL ORDER BY id LIMIT $2",
+            last_id, batch_size
+        )
+        if not rows:
+            return changed
+        last_id = rows[-1]["id"]
+        updates = []
+        for r in rows:
+            norm = float(np.linalg.norm(r["embedding"]))
+            if norm > 0 and abs(norm - 1.0) > 1e-4:
+                updates.append((r["embedding"] / norm, r["id"]))
+        if updates:
+            await executemany(f"UPDATE {table} SET embedding = $1 WHERE id = $2", updates)
+            changed += len(updates)
+
+async def storage_report(table: str) -> Dict[str, Any]:
+    """Heap and index sizes for a table, to compare storage modes."""
+    rows = await fetch(
+        """
+        SELECT c.relname AS name, pg_relation_size(c.oid) AS bytes
+        FROM pg_class c
+        WHERE c.relname = $1
+           OR c.oid IN (SELECT indexrelid FROM pg_index WHERE indrelid = $1::regclass)
+        """,
+        table
+    )
+    return {r["name"]: r["bytes"] for r in rows}
+
+def recall_at_k(exact: List[List[int]], approx: List[List[int]]) -> float:
+    hits = sum(len(set(e) & set(a)) for e, a in zip(exact, approx))
+    total = sum(len(e) for e in exact)
+    return hits / total if total else 0.0
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    if not arr.size:
+        return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0}
+    return {
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+    }
+
+async def benchmark(table: str, queries: int = 50, top_k: int = 10) -> Dict[str, Any]:
+    """
+    Recall@k and latency of each migrated quantized mode against exact float32 search.
+    Uses stored row embeddings as queries; ground truth disables index scans.
+    """
+    sample = await fetch(
+        f"SELECT embedding FROM {table} WHERE embedding IS NOT NULL ORDER BY random() LIMIT $1", queries
+    )
+    vectors = [r["embedding"] for r in sample]
+    present = {
+        r["column_name"] for r in await fetch(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = $1", table
+        )
+    }
+    report: Dict[str, Any] = {"table": table, "queries": len(vectors), "top_k": top_k, "modes": {}}
+
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        async def run(sql: str, exact: bool = False):
+            ids, timings = [], []
+            for vec in vectors:
+                async with conn.transaction():
+                    if exact:
+                        await conn.execute("SET LOCAL enable_indexscan = off")
+                        await conn.execute("SET LOCAL enable_bitmapscan = off")
+                    start = time.perf_counter()
+                    rows = await conn.fetch(sql, vec, top_k)
+                    timings.append((time.perf_counter() - start) * 1000)
+                ids.append([r["id"] for r in rows])
+            return ids, timings
+
+        truth, exact_ms = await run(nearest_sql(table, "id", mode="full"), exact=True)
+        report["modes"]["exact"] = {"recall": 1.0, **latency_summary(exact_ms)}
+
+        indexed, indexed_ms = await run(nearest_sql(table, "id", mode="full"))
+        report["modes"]["full"] = {"recall": round(recall_at_k(truth, indexed), 4), **latency_summary(indexed_ms)}
+
+        for mode, spec in MODES.items():
+            if spec["column"] not in present:
+                continue
+            approx, approx_ms = await run(nearest_sql(table, "id", mode=mode))
+            report["modes"][mode] = {"recall": round(recall_at_k(truth, approx), 4), **latency_summary(approx_ms)}
+
+    report["storage_bytes"] = await storage_report(table)
+    return report
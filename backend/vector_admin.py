@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Add the current directory to sys.path to make imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.database import init_pool, close_pool
+from services import embedding_models, product_families, reembed, vector_indexes, vector_storage
+
+async def main(args):
+    await init_pool()
+    try:
+        await embedding_models.ensure_embedding_model_tables()
+        await vector_indexes.ensure_vector_index_table()
+        await vector_indexes.refresh()
+        if args.command == "migrate":
+            print(f"🔄 Adding {args.mode} copy to {args.table}...")
+            await vector_storage.migrate(args.table, args.mode)
+            print(f"✅ Done. Set VECTOR_STORAGE_MODE={args.mode} and restart to search against it.")
+        elif args.command == "drop":
+            await vector_storage.drop(args.table, args.mode)
+            print(f"✅ Dropped {args.mode} copy from {args.table}")
+        elif args.command == "benchmark":
+            report = await vector_storage.benchmark(args.table, queries=args.queries, top_k=args.top_k)
+            print(json.dumps(report, indent=2))
+        elif args.command == "normalize":
+            changed = await vector_storage.normalize(args.table)
+            print(f"✅ Normalized {changed} vectors in {args.table}")
+        elif args.command == "check":
+            await vector_storage.detect_quantized_tables()
+            if not await vector_storage.check_index_usage():
+                print("✅ Every vector search can use its index")
+        elif args.command == "indexes":
+            plans = await vector_indexes.maintain(apply=args.apply)
+            for p in plans:
+                rows = "?" if p["rows"] is None else p["rows"]
+                print(f"{p['table']:<14} {rows:>9} rows  {p['action']:<8} {p['reason']}")
+        elif args.command == "families":
+            await product_families.ensure_product_family_tables()
+            built = await product_families.rebuild()
+            print(f"✅ Grouped {built['products']} products into {built['families']} families")
+        elif args.command == "reembed":
+            status = await reembed.start(args.table, args.model, shards=args.shards)
+            print(f"🔄 Re-embedding {args.table} into {args.model} across {len(status['shards'])} shards...")
+            total = await reembed.run_shards(args.table, batch_size=args.batch)
+            print(f"✅ Embedded {total} rows into embedding_next")
+            if not args.no_flip:
+                result = await reembed.flip(args.table)
+                print(f"✅ {args.table} now serves {result['model']} ({result['requeued']} rows re-queued)")
+                print("   Run `vector_admin.py finalize` once search quality is confirmed.")
+        elif args.command == "flip":
+            result = await reembed.flip(args.table)
+            print(f"✅ {args.table} now serves {result['model']} ({result['requeued']} rows re-queued)")
+        elif args.command == "finalize":
+            await reembed.finalize(args.table)
+            print(f"✅ Dropped previous embeddings from {args.table}")
+        elif args.command == "status":
+            print(json.dumps(await reembed.status(args.table), indent=2, default=str))
+    finally:
+        await close_pool()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector storage maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("migrate", "add a quantized copy + HNSW index"), ("drop", "remove a quantized copy")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("table", choices=vector_storage.TABLES)
+        p.add_argument("--mode", choices=list(vector_storage.MODES), default="halfvec")
+
+    p = sub.add_parser("benchmark", help="recall@k and latency: exact vs indexed vs quantized")
+    p.add_argument("table", choices=vector_storage.TABLES)
+    p.add_argument("--queries", type=int, default=50)
+    p.add_argument("--top-k", type=int, default=10)
+
+    p = sub.add_parser("normalize", help="L2-normalize stored vectors (needed for inner-product search)")
+    p.add_argument("table", choices=vector_storage.SEARCH_TABLES)
+
+    sub.add_parser("check", help="warn about vector searches that cannot use an index")
+
+    sub.add_parser("families", help="recluster products into families for two-stage matching")
+
+    p = sub.add_parser("indexes", help="plan HNSW/ivfflat indexes from table sizes")
+    p.add_argument("--apply", action="store_true", help="build/rebuild/drop as planned")
+
+    p = sub.add_parser("reembed", help="re-embed a table into a new model (resumable), then flip")
+    p.add_argument("table", choices=reembed.TABLES)
+    p.add_argument("--model", required=True, help="EMBEDDING_MODEL_NAME-style target, e.g. models/text-embedding-004")
+    p.add_argument("--shards", type=int, default=4, help="id ranges embedded in parallel")
+    p.add_argument("--batch", type=int, default=None, help="rows per embedding call (default EMBEDDING_BATCH_SIZE)")
+    p.add_argument("--no-flip", action="store_true", help="stop after embedding; flip later")
+
+    for name, help_text in (
+        ("flip", "serve the re-embedded column"),
+        ("finalize", "drop the previous embeddings after a flip"),
+        ("status", "show migration progress"),
+    ):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("table", choices=reembed.TABLES)
+
+    asyncio.run(main(parser.parse_args()))
@@ -15,8 +15,13 @@ CREATE TABLE IF NOT EXISTS rag_chunks (
     embedding vector(768) -- Matches Gemini embedding dimension
 );
 
--- Index for fast vector similarity search
-CREATE INDEX IF NOT EXISTS rag_chunks_embedding_idx ON rag_chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+-- Vector index is built by the backend's index manager once the table has data
+-- (services/vector_indexes.py; `python vector_admin.py indexes --apply`)
+
+-- Full-text leg of hybrid retrieval, kept current by Postgres on every insert/update
+ALTER TABLE rag_chunks ADD COLUMN IF NOT EXISTS content_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(content, ''))) STORED;
+CREATE INDEX IF NOT EXISTS idx_rag_chunks_content_tsv ON rag_chunks USING gin (content_tsv);
 
 
 
@@ -0,0 +1,39 @@
+-- Durable queue for background embedding (drained by services/embedding_jobs.py)
+CREATE TABLE IF NOT EXISTS embedding_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    target_table TEXT NOT NULL, -- items, products, rag_chunks
+    target_id INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending', -- pending, running, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (target_table, target_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_embedding_jobs_pending ON embedding_jobs (run_after) WHERE status = 'pending';
+
+-- Partial indexes so "embedding IS NULL" counts/sweeps never scan the heap
+CREATE INDEX IF NOT EXISTS items_embedding_missing_idx ON items (id) WHERE embedding IS NULL;
+CREATE INDEX IF NOT EXISTS products_embedding_missing_idx ON products (id) WHERE embedding IS NULL;
+CREATE INDEX IF NOT EXISTS rag_chunks_embedding_missing_idx ON rag_chunks (id) WHERE embedding IS NULL;
+CREATE INDEX IF NOT EXISTS opportunities_embedding_missing_idx ON opportunities (id) WHERE embedding IS NULL;
+
+-- Items are seeded/inserted with plain SQL, so queue them from a trigger
+CREATE OR REPLACE FUNCTION enqueue_item_embedding() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' OR NEW.embedding IS NULL THEN
+        INSERT INTO embedding_jobs (target_table, target_id)
+        VALUES ('items', NEW.id)
+        ON CONFLICT (target_table, target_id) DO UPDATE
+        SET status = 'pending', attempts = 0, last_error = NULL, run_after = NOW(), locked_at = NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS items_enqueue_embedding ON items;
+CREATE TRIGGER items_enqueue_embedding
+    AFTER INSERT OR UPDATE OF title, description ON items
+    FOR EACH ROW EXECUTE FUNCTION enqueue_item_embedding();
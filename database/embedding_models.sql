@@ -0,0 +1,31 @@
+-- Which embedding model each table's `embedding` column currently serves
+CREATE TABLE IF NOT EXISTS embedding_models (
+    table_name TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- In-flight re-embeds (see backend/vector_admin.py reembed) and their shard checkpoints
+CREATE TABLE IF NOT EXISTS embedding_migrations (
+    table_name TEXT PRIMARY KEY,
+    target_model TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running',
+    started_at TIMESTAMPTZ DEFAULT NOW(),
+    flipped_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS embedding_migration_shards (
+    table_name TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    lo INTEGER NOT NULL,
+    hi INTEGER NOT NULL,
+    last_id INTEGER NOT NULL,
+    done BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (table_name, shard)
+);
+
+-- Every stored vector records the model that produced it
+ALTER TABLE items ADD COLUMN IF NOT EXISTS embedding_model TEXT;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS embedding_model TEXT;
+ALTER TABLE opportunities ADD COLUMN IF NOT EXISTS embedding_model TEXT;
+ALTER TABLE rag_chunks ADD COLUMN IF NOT EXISTS embedding_model TEXT;
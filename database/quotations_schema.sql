@@ -52,8 +52,8 @@ CREATE TABLE IF NOT EXISTS products (
     embedding vector(768) -- Google Gemini embedding dimension
 );
 
--- Index for faster vector similarity search
-CREATE INDEX IF NOT EXISTS products_embedding_idx ON products USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+-- Vector index is built by the backend's index manager once the table has data
+-- (services/vector_indexes.py; `python vector_admin.py indexes --apply`)
 
 -- Insert Data (Parsed from your input)
 INSERT INTO products (indoor_outdoor, installation_type, fixture_type, wattage, cct, ip_rating, beam_angle, driver_type, housing_color, cri, connector, description) VALUES
@@ -139,4 +139,13 @@ CREATE TABLE IF NOT EXISTS db_chat_history (
 );
 
 CREATE INDEX IF NOT EXISTS idx_chat_session ON db_chat_history(session_id);
-CREATE INDEX IF NOT EXISTS idx_chat_timestamp ON db_chat_history(timestamp);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_chat_timestamp ON db_chat_history(timestamp);
+-- Numeric specs parsed from the free-text columns, for SQL pre-filtering in RFP matching
+ALTER TABLE products ADD COLUMN IF NOT EXISTS watts NUMERIC GENERATED ALWAYS AS (substring(wattage FROM '(\d+(?:\.\d+)?)\s*[Ww]')::numeric) STORED;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS kelvin INTEGER GENERATED ALWAYS AS (substring(cct FROM '(\d{4,5})\s*[Kk]')::integer) STORED;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS ip_code INTEGER GENERATED ALWAYS AS (substring(ip_rating FROM '[Ii][Pp]\s*(\d{2})')::integer) STORED;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS beam_deg NUMERIC GENERATED ALWAYS AS (substring(beam_angle FROM '(\d+(?:\.\d+)?)\s*(?:[Dd°º]|deg)')::numeric) STORED;
+CREATE INDEX IF NOT EXISTS idx_products_watts ON products (watts);
+CREATE INDEX IF NOT EXISTS idx_products_kelvin ON products (kelvin);
+CREATE INDEX IF NOT EXISTS idx_products_ip_code ON products (ip_code);
+CREATE INDEX IF NOT EXISTS idx_products_beam_deg ON products (beam_deg);
@@ -60,6 +60,16 @@ CREATE TABLE IF NOT EXISTS ab_events (
     timestamp TIMESTAMPTZ NOT NULL
 );
 
--- Optional: vector index (requires pgvector ivfflat; build after data)
--- CREATE INDEX IF NOT EXISTS idx_items_embedding ON items USING ivfflat (embedding vector_l2_ops) WITH (lists = 100);
+-- Embedding cache keyed by provider, model and sha256 of the normalized text
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    embedding REAL[] NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (provider, model, text_hash)
+);
+
+-- Vector index is built by the backend's index manager once the table has data
+-- (services/vector_indexes.py; `python vector_admin.py indexes --apply`)
 
@@ -11,8 +11,13 @@ CREATE TABLE IF NOT EXISTS opportunities (
     embedding vector(768) -- Support for semantic search on project notes
 );
 
--- Index for vector search
-CREATE INDEX IF NOT EXISTS opportunities_embedding_idx ON opportunities USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+-- Vector index is built by the backend's index manager once the table has data
+-- (services/vector_indexes.py; `python vector_admin.py indexes --apply`)
+
+-- Trigram indexes so name search ('%q%' ILIKE) doesn't scan the table
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_opportunities_client_name_trgm ON opportunities USING gin (client_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_opportunities_project_name_trgm ON opportunities USING gin (project_name gin_trgm_ops);
 
 -- Seed Data
 INSERT INTO opportunities (client_name, project_name, status, expected_rfp_date, estimated_value, notes) VALUES